@@ -88,6 +88,16 @@ CREATE TABLE worker_metrics (
 CREATE INDEX idx_worker_metrics_worker_time ON worker_metrics (worker_id, recorded_at DESC);
 
 
+-- LLM extractions keyed by a digest of (prompt, model, host, html); re-crawls and
+-- template/mirror pages skip the LLM call.
+CREATE TABLE llm_cache (
+    html_hash   BYTEA PRIMARY KEY,
+    payload     JSONB NOT NULL,
+    confidence  NUMERIC(5, 4),
+    created_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+
 CREATE OR REPLACE FUNCTION update_url_queue_updated_at()
 RETURNS TRIGGER AS $$
 BEGIN
@@ -4,22 +4,26 @@ from __future__ import annotations
 import argparse
 import asyncio
 
-from .db import close_pool, enqueue_url, get_pool
+try:
+    import uvloop
+except ImportError:  # uvloop is optional (not available on Windows)
+    uvloop = None
+
+from .db import close_pool, enqueue_urls_bulk, get_pool
 
 
 async def enqueue_urls(urls: list[str], priority: int = 0) -> None:
     await get_pool()
-    inserted = 0
-    for url in urls:
-        clean = url.strip()
-        if not clean:
-            continue
-        ok = await enqueue_url(clean, priority=priority, source="seed", depth=0)
-        if ok:
-            inserted += 1
+    cleaned = [url.strip() for url in urls if url.strip()]
+    inserted = await enqueue_urls_bulk([(clean, priority, 0.0, "seed", 0) for clean in cleaned])
+    inserted_count = len(inserted)
+    for clean in cleaned:
+        ok = clean in inserted
+        # Repeated seeds only count once, mirroring ON CONFLICT DO NOTHING.
+        inserted.discard(clean)
         print(f"  {'+ ' if ok else '  (skip) '}{clean}")
     await close_pool()
-    print(f"Inserted {inserted}/{len(urls)} seed URLs")
+    print(f"Inserted {inserted_count}/{len(urls)} seed URLs")
 
 
 def main() -> None:
@@ -28,7 +32,8 @@ def main() -> None:
     parser.add_argument("--priority", type=int, default=0, help="Queue priority for all URLs")
     args = parser.parse_args()
 
-    asyncio.run(enqueue_urls(args.urls, priority=args.priority))
+    run = uvloop.run if uvloop is not None else asyncio.run
+    run(enqueue_urls(args.urls, priority=args.priority))
 
 
 if __name__ == "__main__":
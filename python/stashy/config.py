@@ -1,9 +1,14 @@
-"""Configuration from environment."""
+"""Configuration from environment.
+
+Each getter reads its variable once per process; restart to pick up changes.
+"""
 from __future__ import annotations
 
 import os
+from functools import lru_cache
 
 
+@lru_cache(maxsize=1)
 def get_database_url() -> str:
     return os.environ.get(
         "DATABASE_URL",
@@ -11,37 +16,76 @@ def get_database_url() -> str:
     )
 
 
+@lru_cache(maxsize=1)
+def get_pg_pool_min() -> int:
+    return int(os.environ.get("PG_POOL_MIN", "10"))
+
+
+@lru_cache(maxsize=1)
+def get_pg_pool_max() -> int:
+    return int(os.environ.get("PG_POOL_MAX", "50"))
+
+
+@lru_cache(maxsize=1)
 def get_llm_api_key() -> str | None:
     return os.environ.get("OPENAI_API_KEY")
 
 
+@lru_cache(maxsize=1)
 def get_llm_base_url() -> str | None:
     return os.environ.get("LLM_API_BASE")
 
 
+@lru_cache(maxsize=1)
 def get_crawl_concurrency() -> int:
     return int(os.environ.get("CRAWL_CONCURRENCY", "4"))
 
 
+@lru_cache(maxsize=1)
+def get_context_max_pages() -> int:
+    return int(os.environ.get("BROWSER_CONTEXT_MAX_PAGES", "50"))
+
+
+@lru_cache(maxsize=1)
+def get_analysis_processes() -> int:
+    return int(os.environ.get("ANALYSIS_PROCESSES", str(os.cpu_count() or 1)))
+
+
+@lru_cache(maxsize=1)
 def get_worker_id() -> str:
     return os.environ.get("WORKER_ID", f"worker-{os.getpid()}")
 
 
+@lru_cache(maxsize=1)
 def get_batch_size() -> int:
     return int(os.environ.get("CLAIM_BATCH_SIZE", "10"))
 
 
+@lru_cache(maxsize=1)
+def get_batch_size_max() -> int:
+    return int(os.environ.get("CLAIM_BATCH_MAX", str(get_batch_size() * 4)))
+
+
+@lru_cache(maxsize=1)
+def get_target_p95_ms() -> float:
+    return float(os.environ.get("TARGET_P95_MS", "20000"))
+
+
+@lru_cache(maxsize=1)
 def get_frontier_max_links() -> int:
     return int(os.environ.get("FRONTIER_MAX_LINKS", "16"))
 
 
+@lru_cache(maxsize=1)
 def get_frontier_max_depth() -> int:
     return int(os.environ.get("FRONTIER_MAX_DEPTH", "2"))
 
 
+@lru_cache(maxsize=1)
 def get_geo_score_threshold() -> float:
     return float(os.environ.get("GEO_SCORE_THRESHOLD", "0.28"))
 
 
+@lru_cache(maxsize=1)
 def get_metrics_flush_every() -> int:
     return int(os.environ.get("METRICS_FLUSH_EVERY", "15"))
@@ -2,9 +2,22 @@
 from __future__ import annotations
 
 import asyncio
+import codecs
+import re
+from dataclasses import dataclass
 from typing import Any
 
-from playwright.async_api import async_playwright, Browser, Page, BrowserContext, TimeoutError as PlaywrightTimeout
+from playwright.async_api import (
+    async_playwright,
+    Browser,
+    Page,
+    BrowserContext,
+    Playwright,
+    TimeoutError as PlaywrightTimeout,
+)
+from selectolax.lexbor import LexborHTMLParser
+
+from .config import get_context_max_pages, get_crawl_concurrency
 
 # Default timeout and viewport for consistent DOM
 DEFAULT_TIMEOUT_MS = 30000
@@ -13,6 +26,150 @@ DEFAULT_USER_AGENT = (
     "Mozilla/5.0 (compatible; Stashy/1.0; +https://github.com/stashy)"
 )
 
+_SUMMARY_ATTRS = ("id", "class", "role", "data-testid", "itemprop", "itemtype")
+_SKIP_TAGS = frozenset({"script", "style"})
+_VOID_TAGS = frozenset(
+    {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+)
+
+
+@dataclass(slots=True)
+class _SharedContext:
+    context: BrowserContext
+    opened: int = 0
+    in_flight: int = 0
+    retired: bool = False
+
+
+_playwright: Playwright | None = None
+_browser: Browser | None = None
+# One live context per user agent: Chromium pools keep-alive connections, DNS and TLS
+# sessions per context, so a context per URL re-handshakes with every host. Each is
+# retired after BROWSER_CONTEXT_MAX_PAGES pages so cookies, storage and cache from
+# earlier sites stop accumulating and bleeding into later ones.
+_contexts: dict[str, _SharedContext] = {}
+_browser_lock = asyncio.Lock()
+_context_lock = asyncio.Lock()
+
+
+async def _get_browser() -> Browser:
+    """Launch Chromium once per process."""
+    global _playwright, _browser
+    async with _browser_lock:
+        if _browser is None or not _browser.is_connected():
+            if _playwright is None:
+                _playwright = await async_playwright().start()
+            _contexts.clear()
+            _browser = await _playwright.chromium.launch(
+                headless=True,
+                args=["--disable-dev-shm-usage", "--no-sandbox"],
+            )
+    return _browser
+
+
+async def _acquire_context(user_agent: str) -> _SharedContext:
+    """Shared context for `user_agent`, counted as one more page opened in it."""
+    shared = _contexts.get(user_agent)
+    if shared is None:
+        browser = await _get_browser()
+        async with _context_lock:
+            shared = _contexts.get(user_agent)
+            if shared is None:
+                context = await browser.new_context(
+                    user_agent=user_agent,
+                    viewport=DEFAULT_VIEWPORT,
+                    ignore_https_errors=True,
+                )
+                shared = _contexts[user_agent] = _SharedContext(context)
+    shared.opened += 1
+    shared.in_flight += 1
+    if shared.opened >= max(1, get_context_max_pages()):
+        # Later fetches get a fresh context; this one closes when its last page does.
+        _retire(user_agent, shared)
+    return shared
+
+
+def _retire(user_agent: str, shared: _SharedContext) -> None:
+    shared.retired = True
+    if _contexts.get(user_agent) is shared:
+        del _contexts[user_agent]
+
+
+async def _release_context(shared: _SharedContext) -> None:
+    shared.in_flight -= 1
+    if shared.retired and shared.in_flight == 0:
+        try:
+            await shared.context.close()
+        except Exception:
+            pass
+
+
+async def close_browser() -> None:
+    global _playwright, _browser
+    # Retired contexts with pages still open are closed along with the browser.
+    shared_contexts = list(_contexts.values())
+    _contexts.clear()
+    for shared in shared_contexts:
+        try:
+            await shared.context.close()
+        except Exception:
+            pass
+    if _browser is not None:
+        await _browser.close()
+        _browser = None
+    if _playwright is not None:
+        await _playwright.stop()
+        _playwright = None
+
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+# Matches both <meta charset=x> and <meta http-equiv=Content-Type content="...; charset=x">.
+_META_CHARSET_RE = re.compile(rb"<meta[^>]*?charset\s*=\s*[\"']?\s*([a-zA-Z0-9_.:-]+)", re.IGNORECASE)
+_META_SCAN_BYTES = 1024
+
+
+def _lookup_encoding(label: str) -> str | None:
+    try:
+        name = codecs.lookup(label).name
+    except LookupError:
+        return None
+    # WHATWG Encoding: browsers decode latin-1 and ASCII labels as windows-1252.
+    return "cp1252" if name in ("iso8859-1", "ascii") else name
+
+
+def _charset(content_type_header: str) -> str | None:
+    """Charset from a Content-Type header; None when absent or unknown."""
+    for param in content_type_header.split(";")[1:]:
+        key, _, value = param.partition("=")
+        if key.strip().lower() == "charset":
+            return _lookup_encoding(value.strip().strip("\"'"))
+    return None
+
+
+def _body_encoding(body: bytes, content_type_header: str) -> str | None:
+    """
+    Encoding for an HTML body the way a browser picks it: BOM, then the Content-Type
+    charset, then a <meta> declaration in the first 1 KB. None when nothing declares one.
+    """
+    for bom, encoding in _BOMS:
+        if body.startswith(bom):
+            return encoding
+    encoding = _charset(content_type_header)
+    if encoding is not None:
+        return encoding
+    match = _META_CHARSET_RE.search(body, 0, _META_SCAN_BYTES)
+    if match is None:
+        return None
+    encoding = _lookup_encoding(match.group(1).decode("ascii"))
+    # A byte-oriented <meta> can't really be UTF-16; browsers read it as UTF-8.
+    if encoding is not None and encoding.startswith("utf-16"):
+        return "utf-8"
+    return encoding
+
 
 async def get_page_html(
     url: str,
@@ -20,62 +177,121 @@ async def get_page_html(
     timeout_ms: int = DEFAULT_TIMEOUT_MS,
     user_agent: str = DEFAULT_USER_AGENT,
     wait_until: str = "domcontentloaded",
+    need_js_render: bool = False,
 ) -> tuple[str | None, int | None, str | None]:
     """
     Load URL with Playwright and return (html, status_code, content_type).
+    HTML responses are returned as the raw network body unless need_js_render
+    asks for the serialized post-script DOM.
     On failure returns (None, status_code_or_0, None).
     """
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        try:
-            context = await browser.new_context(
-                user_agent=user_agent,
-                viewport=DEFAULT_VIEWPORT,
-                ignore_https_errors=True,
-            )
-            page = await context.new_page()
-            await page.set_default_timeout(timeout_ms)
-            response = await page.goto(url, wait_until=wait_until, timeout=timeout_ms)
-            status = response.status if response else None
-            content_type = None
-            if response and response.headers.get("content-type"):
-                content_type = response.headers["content-type"].split(";")[0].strip()
+    try:
+        shared = await _acquire_context(user_agent)
+    except Exception:
+        return (None, 0, None)
+    try:
+        page = await shared.context.new_page()
+    except Exception:
+        # A dead context would fail every later fetch too; retire it so the next call rebuilds.
+        _retire(user_agent, shared)
+        await _release_context(shared)
+        return (None, 0, None)
+    try:
+        page.set_default_timeout(timeout_ms)
+        response = await page.goto(url, wait_until=wait_until, timeout=timeout_ms)
+        status = response.status if response else None
+        content_type = None
+        header = response.headers.get("content-type") if response else None
+        if header:
+            content_type = header.split(";")[0].strip()
+        html = None
+        if response and header and "html" in content_type.lower() and not need_js_render:
+            # Skip page.content(): serializing the live DOM costs a full extra copy. Pages
+            # that declare no charset fall through to it, since Chromium's sniffing decoded them.
+            try:
+                body = await response.body()
+                encoding = _body_encoding(body, header)
+                if encoding is not None:
+                    html = body.decode(encoding, errors="replace")
+            except Exception:
+                html = None
+        if html is None:
             html = await page.content()
-            return (html, status, content_type)
-        except PlaywrightTimeout:
-            return (None, 0, None)
+        return (html, status, content_type)
+    except PlaywrightTimeout:
+        return (None, 0, None)
+    except Exception:
+        return (None, 0, None)
+    finally:
+        try:
+            # Closing a page whose target already crashed raises TargetClosedError.
+            await page.close()
         except Exception:
-            return (None, 0, None)
+            pass
         finally:
-            await browser.close()
+            await _release_context(shared)
+
+
+async def fetch_many(
+    urls: list[str],
+    concurrency: int | None = None,
+    **kwargs: Any,
+) -> list[tuple[str | None, int | None, str | None]]:
+    """
+    Fetch URLs concurrently against the shared browser, at most `concurrency`
+    (default CRAWL_CONCURRENCY) pages in flight. Results are in input order.
+    """
+    sem = asyncio.Semaphore(max(1, concurrency or get_crawl_concurrency()))
+
+    async def one(url: str) -> tuple[str | None, int | None, str | None]:
+        async with sem:
+            return await get_page_html(url, **kwargs)
+
+    async with asyncio.TaskGroup() as tg:
+        tasks = [tg.create_task(one(url)) for url in urls]
+    return [task.result() for task in tasks]
 
 
-def _build_dom_summary(html: str, max_chars: int = 50000) -> str:
+def _build_dom_summary(html: str | LexborHTMLParser, max_chars: int = 50000) -> str:
     """
     Build a compact DOM summary for the LLM: tag structure and key attributes,
-    truncating very large pages to stay within context limits.
+    truncating very large pages to stay within context limits. Accepts raw HTML
+    or an already-parsed tree so callers can share a single parse.
     """
-    import re
-    # Strip scripts and styles to reduce noise
-    text = re.sub(r"<script[^>]*>[\s\S]*?</script>", "", html, flags=re.I)
-    text = re.sub(r"<style[^>]*>[\s\S]*?</style>", "", text, flags=re.I)
-    # Keep tag names and important attributes (id, class, data-*, role)
-    def simplify_tag(m):
-        tag = m.group(1).lower()
-        rest = m.group(2) or ""
-        attrs = []
-        for attr in ("id", "class", "role", "data-testid", "itemprop", "itemtype"):
-            ma = re.search(rf'\b{attr}\s*=\s*["\']([^"\']*)["\']', rest, re.I)
-            if ma:
-                attrs.append(f'{attr}="{ma.group(1)[:80]}"')
-        attr_str = " " + " ".join(attrs) if attrs else ""
-        return f"<{tag}{attr_str}>"
-    text = re.sub(r"<(\w+)([^>]*)>", simplify_tag, text)
+    tree = LexborHTMLParser(html) if isinstance(html, str) else html
+    parts: list[str] = []
+    size = 0
+    # Iterative pre-order walk; closing tags are pushed as plain strings so deep
+    # documents never hit the recursion limit.
+    stack: list[Any] = [tree.root] if tree.root is not None else []
+    # Stop as soon as the summary is past max_chars; the rest would be truncated anyway.
+    while stack and size <= max_chars:
+        node = stack.pop()
+        if isinstance(node, str):
+            piece = node
+        else:
+            tag = node.tag
+            if tag == "-text":
+                piece = node.text_content or ""
+            # Skip comments/doctype and script/style noise
+            elif tag.startswith("-") or tag in _SKIP_TAGS:
+                continue
+            else:
+                # Keep tag names and important attributes (id, class, data-*, role)
+                attrs = node.attributes
+                kept = [f'{attr}="{attrs[attr][:80]}"' for attr in _SUMMARY_ATTRS if attrs.get(attr)]
+                piece = f"<{tag} {' '.join(kept)}>" if kept else f"<{tag}>"
+                if tag not in _VOID_TAGS:
+                    stack.append(f"</{tag}>")
+                stack.extend(reversed(list(node.iter(include_text=True))))
+        parts.append(piece)
+        size += len(piece)
+    text = "".join(parts)
     if len(text) > max_chars:
         text = text[:max_chars] + "\n... [truncated]"
     return text
 
 
-def build_dom_summary(html: str, max_chars: int = 50000) -> str:
+def build_dom_summary(html: str | LexborHTMLParser, max_chars: int = 50000) -> str:
     """Public wrapper for DOM summary used by the LLM analyzer."""
     return _build_dom_summary(html, max_chars)
@@ -1,23 +1,137 @@
 """Async PostgreSQL access: adaptive frontier queue, raw pages, extractions, metrics."""
 from __future__ import annotations
 
+import json
+import time
 from typing import Any, Iterable
 
 import asyncpg
 
-from .config import get_database_url
+from .config import get_database_url, get_pg_pool_max, get_pg_pool_min
 
 _pool: asyncpg.Pool | None = None
+# statuses -> (monotonic time, depth) for queue_depth_cached.
+_depth_cache: dict[tuple[str, ...], tuple[float, int]] = {}
+
+# Hot-path statements, kept byte-identical so every call hits asyncpg's
+# per-connection prepared statement cache instead of re-parsing on the server.
+_STMTS: dict[str, str] = {
+    "claim": "SELECT * FROM claim_pending_urls($1, $2)",
+    "mark_done": """UPDATE url_queue
+           SET status = 'done', claimed_at = NULL, claimed_by = NULL, processed_at = now()
+           WHERE id = $1""",
+    "mark_failed": """UPDATE url_queue
+           SET status = CASE WHEN retries + 1 >= max_retries THEN 'failed' ELSE 'pending' END,
+               retries = retries + 1,
+               claimed_at = NULL,
+               claimed_by = NULL,
+               error = $2,
+               updated_at = now()
+           WHERE id = $1""",
+    "insert_raw_page": """INSERT INTO raw_pages (url_id, url, html, status_code, content_type)
+           VALUES ($1, $2, $3, $4, $5)
+           ON CONFLICT (url_id)
+           DO UPDATE SET html = $3, status_code = $4, content_type = $5, fetched_at = now()
+           RETURNING id""",
+    "insert_extraction": """INSERT INTO extractions (url_id, page_id, schema_name, payload, confidence, geo_score, signals)
+           VALUES ($1, $2, $3, $4, $5, $6, $7)
+           ON CONFLICT (url_id)
+           DO UPDATE SET
+             page_id = $2,
+             schema_name = $3,
+             payload = $4,
+             confidence = $5,
+             geo_score = $6,
+             signals = $7,
+             extracted_at = now()""",
+    # raw page + extraction + done in one round-trip; the extraction reads the page id from the CTE.
+    "finalize_page": """WITH page AS (
+             INSERT INTO raw_pages (url_id, url, html, status_code, content_type)
+             VALUES ($1, $2, $3, $4, $5)
+             ON CONFLICT (url_id)
+             DO UPDATE SET html = $3, status_code = $4, content_type = $5, fetched_at = now()
+             RETURNING id
+           ), extraction AS (
+             INSERT INTO extractions (url_id, page_id, schema_name, payload, confidence, geo_score, signals)
+             SELECT $1, page.id, $6::text, $7::jsonb, $8::numeric, $9::real, $10::jsonb FROM page
+             ON CONFLICT (url_id)
+             DO UPDATE SET
+               page_id = EXCLUDED.page_id,
+               schema_name = EXCLUDED.schema_name,
+               payload = EXCLUDED.payload,
+               confidence = EXCLUDED.confidence,
+               geo_score = EXCLUDED.geo_score,
+               signals = EXCLUDED.signals,
+               extracted_at = now()
+           )
+           UPDATE url_queue
+           SET status = 'done', claimed_at = NULL, claimed_by = NULL, processed_at = now()
+           WHERE id = $1
+           RETURNING (SELECT id FROM page)""",
+    "enqueue_url": """INSERT INTO url_queue (url, priority, geo_score, source, depth)
+           VALUES ($1, $2, $3, $4, $5)
+           ON CONFLICT (url) DO NOTHING
+           RETURNING id""",
+    "upsert_discovered_url": "SELECT upsert_discovered_url($1, $2, $3, $4, $5, $6)",
+    # Same conflict rules as the upsert_discovered_url() SQL function, applied set-wise.
+    "upsert_discovered_urls": """INSERT INTO url_queue (url, priority, geo_score, source, depth, parent_url_id)
+           SELECT DISTINCT ON (c.url) c.url, c.priority, c.geo_score, c.source, c.depth, $1::bigint
+           FROM unnest($2::text[], $3::int[], $4::real[], $5::text[], $6::int[])
+             AS c(url, priority, geo_score, source, depth)
+           ORDER BY c.url, c.priority DESC
+           ON CONFLICT (url) DO UPDATE
+           SET priority = GREATEST(url_queue.priority, EXCLUDED.priority),
+               geo_score = GREATEST(url_queue.geo_score, EXCLUDED.geo_score),
+               parent_url_id = COALESCE(url_queue.parent_url_id, EXCLUDED.parent_url_id),
+               depth = LEAST(url_queue.depth, EXCLUDED.depth),
+               source = CASE
+                   WHEN url_queue.source = 'seed' THEN url_queue.source
+                   ELSE EXCLUDED.source
+               END,
+               status = CASE
+                   WHEN url_queue.status IN ('done', 'failed') THEN 'pending'
+                   ELSE url_queue.status
+               END,
+               retries = CASE
+                   WHEN url_queue.status IN ('done', 'failed') THEN 0
+                   ELSE url_queue.retries
+               END,
+               claimed_at = CASE
+                   WHEN url_queue.status IN ('done', 'failed') THEN NULL
+                   ELSE url_queue.claimed_at
+               END,
+               claimed_by = CASE
+                   WHEN url_queue.status IN ('done', 'failed') THEN NULL
+                   ELSE url_queue.claimed_by
+               END,
+               updated_at = now()
+           RETURNING (xmax = 0) AS inserted""",
+    "queue_depth": "SELECT COUNT(*)::INT FROM url_queue WHERE status = ANY($1::text[])",
+    "get_cached_analysis": "SELECT payload, confidence FROM llm_cache WHERE html_hash = $1",
+    "put_cached_analysis": """INSERT INTO llm_cache (html_hash, payload, confidence)
+           VALUES ($1, $2::jsonb, $3)
+           ON CONFLICT (html_hash) DO NOTHING""",
+    "record_worker_metrics": "SELECT record_worker_metrics($1, $2, $3, $4, $5, $6, $7)",
+}
+
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    # Let callers pass plain dicts for the JSONB payload/signals columns.
+    await conn.set_type_codec("jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
 
 
 async def get_pool() -> asyncpg.Pool:
     global _pool
     if _pool is None:
+        min_size = get_pg_pool_min()
         _pool = await asyncpg.create_pool(
             get_database_url(),
-            min_size=2,
-            max_size=20,
+            min_size=min_size,
+            max_size=max(min_size, get_pg_pool_max()),
             command_timeout=60,
+            statement_cache_size=2048,
+            max_inactive_connection_lifetime=300,
+            init=_init_connection,
         )
     return _pool
 
@@ -32,34 +146,18 @@ async def close_pool() -> None:
 async def claim_pending_urls(worker_id: str, batch_size: int = 10) -> list[dict[str, Any]]:
     """Claim up to batch_size pending URLs for this worker."""
     pool = await get_pool()
-    rows = await pool.fetch("SELECT * FROM claim_pending_urls($1, $2)", worker_id, batch_size)
+    rows = await pool.fetch(_STMTS["claim"], worker_id, batch_size)
     return [dict(r) for r in rows]
 
 
 async def mark_url_done(url_id: int) -> None:
     pool = await get_pool()
-    await pool.execute(
-        """UPDATE url_queue
-           SET status = 'done', claimed_at = NULL, claimed_by = NULL, processed_at = now()
-           WHERE id = $1""",
-        url_id,
-    )
+    await pool.execute(_STMTS["mark_done"], url_id)
 
 
 async def mark_url_failed(url_id: int, error: str) -> None:
     pool = await get_pool()
-    await pool.execute(
-        """UPDATE url_queue
-           SET status = CASE WHEN retries + 1 >= max_retries THEN 'failed' ELSE 'pending' END,
-               retries = retries + 1,
-               claimed_at = NULL,
-               claimed_by = NULL,
-               error = $2,
-               updated_at = now()
-           WHERE id = $1""",
-        url_id,
-        error[:4096],
-    )
+    await pool.execute(_STMTS["mark_failed"], url_id, error[:4096])
 
 
 async def insert_raw_page(
@@ -71,11 +169,7 @@ async def insert_raw_page(
 ) -> int:
     pool = await get_pool()
     row = await pool.fetchrow(
-        """INSERT INTO raw_pages (url_id, url, html, status_code, content_type)
-           VALUES ($1, $2, $3, $4, $5)
-           ON CONFLICT (url_id)
-           DO UPDATE SET html = $3, status_code = $4, content_type = $5, fetched_at = now()
-           RETURNING id""",
+        _STMTS["insert_raw_page"],
         url_id,
         url,
         html,
@@ -97,17 +191,7 @@ async def insert_extraction(
 ) -> None:
     pool = await get_pool()
     await pool.execute(
-        """INSERT INTO extractions (url_id, page_id, schema_name, payload, confidence, geo_score, signals)
-           VALUES ($1, $2, $3, $4, $5, $6, $7)
-           ON CONFLICT (url_id)
-           DO UPDATE SET
-             page_id = $2,
-             schema_name = $3,
-             payload = $4,
-             confidence = $5,
-             geo_score = $6,
-             signals = $7,
-             extracted_at = now()""",
+        _STMTS["insert_extraction"],
         url_id,
         page_id,
         schema_name,
@@ -118,6 +202,37 @@ async def insert_extraction(
     )
 
 
+async def finalize_page(
+    url_id: int,
+    url: str,
+    html: str | None,
+    status_code: int | None,
+    content_type: str | None,
+    schema_name: str | None,
+    payload: dict[str, Any],
+    confidence: float | None,
+    *,
+    geo_score: float | None = None,
+    signals: dict[str, Any] | None = None,
+) -> int:
+    """Store the raw page and extraction and mark the URL done in one statement; returns page id."""
+    pool = await get_pool()
+    page_id = await pool.fetchval(
+        _STMTS["finalize_page"],
+        url_id,
+        url,
+        html,
+        status_code,
+        content_type,
+        schema_name,
+        payload,
+        confidence,
+        geo_score,
+        signals,
+    )
+    return int(page_id)
+
+
 async def enqueue_url(
     url: str,
     priority: int = 0,
@@ -129,10 +244,7 @@ async def enqueue_url(
     """Add URL to queue if not present; returns True on insert."""
     pool = await get_pool()
     row = await pool.fetchrow(
-        """INSERT INTO url_queue (url, priority, geo_score, source, depth)
-           VALUES ($1, $2, $3, $4, $5)
-           ON CONFLICT (url) DO NOTHING
-           RETURNING id""",
+        _STMTS["enqueue_url"],
         url,
         priority,
         max(0.0, min(1.0, geo_score)),
@@ -142,6 +254,37 @@ async def enqueue_url(
     return row is not None
 
 
+async def enqueue_urls_bulk(rows: list[tuple[str, int, float, str, int]]) -> set[str]:
+    """COPY (url, priority, geo_score, source, depth) rows into the queue; returns inserted URLs."""
+    if not rows:
+        return set()
+    records = [
+        (url, priority, max(0.0, min(1.0, geo_score)), source, max(0, depth))
+        for url, priority, geo_score, source, depth in rows
+    ]
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            # Temp tables skip WAL already; ON COMMIT DROP keeps pooled connections clean.
+            await conn.execute(
+                """CREATE TEMP TABLE url_queue_stage (
+                     url TEXT, priority INT, geo_score REAL, source TEXT, depth INT
+                   ) ON COMMIT DROP"""
+            )
+            await conn.copy_records_to_table(
+                "url_queue_stage",
+                records=records,
+                columns=["url", "priority", "geo_score", "source", "depth"],
+            )
+            inserted = await conn.fetch(
+                """INSERT INTO url_queue (url, priority, geo_score, source, depth)
+                   SELECT url, priority, geo_score, source, depth FROM url_queue_stage
+                   ON CONFLICT (url) DO NOTHING
+                   RETURNING url"""
+            )
+    return {r["url"] for r in inserted}
+
+
 async def upsert_discovered_url(
     *,
     parent_url_id: int,
@@ -153,7 +296,7 @@ async def upsert_discovered_url(
 ) -> bool:
     pool = await get_pool()
     value = await pool.fetchval(
-        "SELECT upsert_discovered_url($1, $2, $3, $4, $5, $6)",
+        _STMTS["upsert_discovered_url"],
         parent_url_id,
         url,
         priority,
@@ -164,14 +307,66 @@ async def upsert_discovered_url(
     return bool(value)
 
 
+async def upsert_discovered_urls(
+    parent_url_id: int,
+    candidates: list[tuple[str, int, float, str, int]],
+) -> int:
+    """Bulk upsert_discovered_url over (url, priority, geo_score, source, depth) rows; returns new-row count."""
+    if not candidates:
+        return 0
+    urls, priorities, geo_scores, sources, depths = zip(*candidates)
+    pool = await get_pool()
+    # One prepared statement and one round trip: a page's frontier is tens of rows,
+    # too few for a COPY into a temp table to pay for its extra statements.
+    inserted = await pool.fetch(
+        _STMTS["upsert_discovered_urls"],
+        parent_url_id,
+        list(urls),
+        list(priorities),
+        [max(0.0, min(1.0, g)) for g in geo_scores],
+        list(sources),
+        [max(0, d) for d in depths],
+    )
+    return sum(1 for r in inserted if r["inserted"])
+
+
+async def get_cached_analysis(key: bytes) -> tuple[dict[str, Any], float] | None:
+    """Cached (payload, confidence) for an analysis key, or None on a miss."""
+    pool = await get_pool()
+    row = await pool.fetchrow(_STMTS["get_cached_analysis"], key)
+    if row is None:
+        return None
+    return (row["payload"], float(row["confidence"] or 0.0))
+
+
+async def put_cached_analysis(key: bytes, payload: dict[str, Any], confidence: float) -> None:
+    pool = await get_pool()
+    await pool.execute(_STMTS["put_cached_analysis"], key, payload, confidence)
+
+
 async def queue_depth(statuses: Iterable[str] = ("pending", "in_progress")) -> int:
     pool = await get_pool()
     rows = list(statuses)
     return int(
-        await pool.fetchval("SELECT COUNT(*)::INT FROM url_queue WHERE status = ANY($1::text[])", rows)
+        await pool.fetchval(_STMTS["queue_depth"], rows)
     )
 
 
+async def queue_depth_cached(
+    statuses: Iterable[str] = ("pending", "in_progress"),
+    ttl_s: float = 5.0,
+) -> int:
+    """queue_depth, reused for ttl_s: metrics and claim sizing only need its magnitude."""
+    key = tuple(statuses)
+    now = time.monotonic()
+    hit = _depth_cache.get(key)
+    if hit is not None and now - hit[0] < ttl_s:
+        return hit[1]
+    depth = await queue_depth(key)
+    _depth_cache[key] = (now, depth)
+    return depth
+
+
 async def record_worker_metrics(
     *,
     worker_id: str,
@@ -184,7 +379,7 @@ async def record_worker_metrics(
 ) -> None:
     pool = await get_pool()
     await pool.execute(
-        "SELECT record_worker_metrics($1, $2, $3, $4, $5, $6, $7)",
+        _STMTS["record_worker_metrics"],
         worker_id,
         processed_count,
         failed_count,
@@ -1,16 +1,22 @@
 """LLM + heuristic DOM analysis for extraction and geospatial signal generation."""
 from __future__ import annotations
 
-import json
+import hashlib
 import os
 import re
-from typing import Any
+from dataclasses import dataclass
+from functools import cached_property
+from typing import TYPE_CHECKING, Any
+from urllib.parse import urlsplit
 
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_openai import ChatOpenAI
+import orjson
+from selectolax.lexbor import LexborHTMLParser
 
 from .crawler import build_dom_summary
 
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
 SYSTEM_PROMPT = """You are an expert web extraction engine for geospatial AI indexing.
 Given a simplified DOM, extract a compact JSON payload with this exact shape:
 {
@@ -33,6 +39,33 @@ Rules:
 - main_content should be concise and readable text.
 """
 
+# Short ASCII needles: CPython's C substring search beats a Python-driven
+# Aho-Corasick or regex-alternation pass over the 4k-char haystack. Mostly-ASCII
+# text is already stored one byte per char, so encoding to bytes only adds a copy.
+_FALLBACK_GEO_TERMS = (
+    "map",
+    "mapping",
+    "geospatial",
+    "city",
+    "street",
+    "vps",
+    "localization",
+    "positioning",
+    "navigation",
+    "3d",
+    "reconstruction",
+    "sfm",
+    "mesh",
+    "pointcloud",
+    "ar",
+    "xr",
+    "robot",
+)
+_VPS_TERMS = frozenset({"vps", "localization", "positioning", "ar", "xr"})
+_RECON_TERMS = frozenset({"3d", "reconstruction", "sfm", "mesh", "pointcloud"})
+_RE_LOCATION_HINT = re.compile(r"\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+){0,2})\b")
+_RE_RECENT_YEAR = re.compile(r"\b(202[4-9]|203\d)\b")
+
 USER_PROMPT_TEMPLATE = """Analyze and extract structured content from this page.
 
 URL: {url}
@@ -41,10 +74,35 @@ DOM summary:
 """
 
 
+# Confidence of a complete LLM extraction; anything lower was a parse failure or partial answer.
+LLM_SUCCESS_CONFIDENCE = 0.95
+
+_PROMPT_DIGEST = hashlib.blake2b(f"{SYSTEM_PROMPT}\0{USER_PROMPT_TEMPLATE}".encode(), digest_size=16).digest()
+
+
+def analysis_cache_key(html: str, url: str) -> bytes | None:
+    """
+    Content key for an LLM analysis of `html`, namespaced by prompt, model and host.
+    None when no LLM is configured: the heuristic fallback is cheaper than a lookup.
+    """
+    if not os.environ.get("OPENAI_API_KEY"):
+        return None
+    h = hashlib.blake2b(_PROMPT_DIGEST, digest_size=16)
+    h.update(os.environ.get("LLM_MODEL", "gpt-4o-mini").encode())
+    h.update(b"\0")
+    h.update(urlsplit(url).netloc.lower().encode())
+    h.update(b"\0")
+    h.update(html.encode("utf-8", "surrogatepass"))
+    return h.digest()
+
+
 def get_llm() -> ChatOpenAI | None:
     api_key = os.environ.get("OPENAI_API_KEY")
     if not api_key:
         return None
+    # Imported lazily: langchain costs ~1s at import and keyless deployments never use it.
+    from langchain_openai import ChatOpenAI
+
     base_url = os.environ.get("LLM_API_BASE")
     model = os.environ.get("LLM_MODEL", "gpt-4o-mini")
     kwargs: dict[str, Any] = {"model": model, "temperature": 0, "api_key": api_key}
@@ -61,6 +119,10 @@ def _ensure_float_01(value: Any, default: float = 0.0) -> float:
     return max(0.0, min(1.0, f))
 
 
+def _clip(value: Any, limit: int) -> str | None:
+    return str(value).strip()[:limit] if value else None
+
+
 def _normalize_payload(payload: dict[str, Any]) -> dict[str, Any]:
     links = payload.get("links")
     if not isinstance(links, list):
@@ -70,8 +132,8 @@ def _normalize_payload(payload: dict[str, Any]) -> dict[str, Any]:
         if not isinstance(item, dict):
             continue
         href = str(item.get("href") or "").strip()
-        text = str(item.get("text") or "").strip()
         if href:
+            text = str(item.get("text") or "").strip()
             norm_links.append({"href": href[:2048], "text": text[:220]})
 
     geo_entities = payload.get("geo_entities")
@@ -82,16 +144,12 @@ def _normalize_payload(payload: dict[str, Any]) -> dict[str, Any]:
         location_hints = []
 
     return {
-        "title": (str(payload.get("title")).strip()[:500] if payload.get("title") else None),
+        "title": _clip(payload.get("title"), 500),
         "main_content": str(payload.get("main_content") or "")[:12000],
         "links": norm_links,
-        "description": (
-            str(payload.get("description")).strip()[:500] if payload.get("description") else None
-        ),
-        "article_date": (
-            str(payload.get("article_date")).strip()[:80] if payload.get("article_date") else None
-        ),
-        "author": (str(payload.get("author")).strip()[:180] if payload.get("author") else None),
+        "description": _clip(payload.get("description"), 500),
+        "article_date": _clip(payload.get("article_date"), 80),
+        "author": _clip(payload.get("author"), 180),
         "geo_entities": [str(x)[:120] for x in geo_entities[:25]],
         "location_hints": [str(x)[:120] for x in location_hints[:25]],
         "vps_relevance": _ensure_float_01(payload.get("vps_relevance"), 0.0),
@@ -100,16 +158,11 @@ def _normalize_payload(payload: dict[str, Any]) -> dict[str, Any]:
     }
 
 
-def _extract_links_regex(html: str) -> list[dict[str, str]]:
+def _extract_links(tree: LexborHTMLParser) -> list[dict[str, str]]:
     out: list[dict[str, str]] = []
-    for m in re.finditer(
-        r'<a\s+[^>]*href=["\']([^"\']+)["\'][^>]*>(.*?)</a>',
-        html,
-        re.IGNORECASE | re.DOTALL,
-    ):
-        href = m.group(1).strip()[:2048]
-        text = re.sub(r"<[^>]+>", " ", m.group(2))
-        text = " ".join(text.split())[:220]
+    for node in tree.css("a[href]"):
+        href = (node.attributes.get("href") or "").strip()[:2048]
+        text = " ".join(node.text(separator=" ").split())[:220]
         if href:
             out.append({"href": href, "text": text})
         if len(out) >= 50:
@@ -117,7 +170,62 @@ def _extract_links_regex(html: str) -> list[dict[str, str]]:
     return out
 
 
-def _fallback_extraction(html: str, url: str) -> tuple[dict[str, Any], float]:
+@dataclass
+class ParsedPage:
+    """
+    One lexbor parse of a page, shared by the DOM summary and the heuristic fallback.
+    Derived fields are read lazily from the tree, so the LLM path pays only for the parse.
+    """
+
+    tree: LexborHTMLParser
+
+    @cached_property
+    def title(self) -> str | None:
+        node = self.tree.css_first("title")
+        return (node.text().strip()[:500] or None) if node is not None else None
+
+    @cached_property
+    def description(self) -> str | None:
+        node = self.tree.css_first('meta[name="description" i]')
+        if node is None:
+            return None
+        return (node.attributes.get("content") or "").strip()[:500] or None
+
+    @cached_property
+    def links(self) -> list[dict[str, str]]:
+        return _extract_links(self.tree)
+
+    @cached_property
+    def raw_text(self) -> str:
+        # Text extraction is the only consumer that must not see script/style bodies.
+        self.tree.strip_tags(["script", "style"])
+        if self.tree.root is None:
+            return ""
+        return self.tree.root.text(separator=" ")
+
+    def visible_text(self, limit: int) -> str:
+        """
+        Equivalent to " ".join(raw_text.split())[:limit], but only tokenizes a
+        growing prefix of the page instead of every word of a multi-MB document.
+        """
+        text = self.raw_text
+        window = max(1, limit) * 2
+        while True:
+            normalized = " ".join(text[:window].split())
+            if window >= len(text):
+                return normalized[:limit]
+            # The window may end mid-word; only the tokens before the last one are final.
+            settled = normalized.rpartition(" ")[0]
+            if len(settled) >= limit:
+                return settled[:limit]
+            window *= 2
+
+
+def parse_page(html: str) -> ParsedPage:
+    return ParsedPage(tree=LexborHTMLParser(html))
+
+
+def _fallback_extraction(page: ParsedPage, url: str) -> tuple[dict[str, Any], float]:
     payload: dict[str, Any] = {
         "title": None,
         "main_content": "",
@@ -132,57 +240,24 @@ def _fallback_extraction(html: str, url: str) -> tuple[dict[str, Any], float]:
         "recency_signal": 0.0,
     }
 
-    m = re.search(r"<title[^>]*>([^<]+)</title>", html, re.IGNORECASE | re.DOTALL)
-    if m:
-        payload["title"] = m.group(1).strip()[:500]
+    payload["title"] = page.title
+    payload["description"] = page.description
+    payload["links"] = page.links
 
-    m = re.search(
-        r'<meta\s+name=["\']description["\'][^>]*content=["\']([^"\']+)["\']',
-        html,
-        re.IGNORECASE,
-    )
-    if m:
-        payload["description"] = m.group(1).strip()[:500]
-
-    payload["links"] = _extract_links_regex(html)
-
-    text = re.sub(r"<script[^>]*>[\s\S]*?</script>", " ", html, flags=re.IGNORECASE)
-    text = re.sub(r"<style[^>]*>[\s\S]*?</style>", " ", text, flags=re.IGNORECASE)
-    text = re.sub(r"<[^>]+>", " ", text)
-    text = " ".join(text.split())
-    payload["main_content"] = text[:10000]
+    text = page.visible_text(10000)
+    payload["main_content"] = text
 
     combined = f"{url}\n{payload['title'] or ''}\n{payload['description'] or ''}\n{text[:4000]}".lower()
 
-    geo_terms = [
-        "map",
-        "mapping",
-        "geospatial",
-        "city",
-        "street",
-        "vps",
-        "localization",
-        "positioning",
-        "navigation",
-        "3d",
-        "reconstruction",
-        "sfm",
-        "mesh",
-        "pointcloud",
-        "ar",
-        "xr",
-        "robot",
-    ]
-    hits = [term for term in geo_terms if term in combined]
+    hits = [term for term in _FALLBACK_GEO_TERMS if term in combined]
 
     payload["geo_entities"] = hits[:15]
-    payload["location_hints"] = re.findall(
-        r"\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+){0,2})\b", (payload["main_content"] or "")[:2500]
-    )[:10]
+    payload["location_hints"] = _RE_LOCATION_HINT.findall((payload["main_content"] or "")[:2500])[:10]
 
-    payload["vps_relevance"] = max(0.0, min(1.0, 0.08 * len([h for h in hits if h in {"vps", "localization", "positioning", "ar", "xr"}])))
-    payload["reconstruction_relevance"] = max(0.0, min(1.0, 0.08 * len([h for h in hits if h in {"3d", "reconstruction", "sfm", "mesh", "pointcloud"}])))
-    payload["recency_signal"] = 0.8 if re.search(r"\b(202[4-9]|203\d)\b", combined) else 0.3
+    # hits holds distinct terms, so the intersection size is the per-category hit count.
+    payload["vps_relevance"] = max(0.0, min(1.0, 0.08 * len(_VPS_TERMS.intersection(hits))))
+    payload["reconstruction_relevance"] = max(0.0, min(1.0, 0.08 * len(_RECON_TERMS.intersection(hits))))
+    payload["recency_signal"] = 0.8 if _RE_RECENT_YEAR.search(combined) else 0.3
 
     confidence = 0.67 if payload["main_content"] else 0.45
     return (_normalize_payload(payload), confidence)
@@ -190,10 +265,13 @@ def _fallback_extraction(html: str, url: str) -> tuple[dict[str, Any], float]:
 
 def analyze_dom_with_llm(html: str, url: str, max_dom_chars: int = 50000) -> tuple[dict[str, Any], float]:
     llm = get_llm()
+    page = parse_page(html)
     if not llm:
-        return _fallback_extraction(html, url)
+        return _fallback_extraction(page, url)
+
+    from langchain_core.messages import HumanMessage, SystemMessage
 
-    dom_summary = build_dom_summary(html, max_chars=max_dom_chars)
+    dom_summary = build_dom_summary(page.tree, max_chars=max_dom_chars)
     user_content = USER_PROMPT_TEMPLATE.format(dom_summary=dom_summary, url=url)
     messages = [SystemMessage(content=SYSTEM_PROMPT), HumanMessage(content=user_content)]
 
@@ -206,8 +284,8 @@ def analyze_dom_with_llm(html: str, url: str, max_dom_chars: int = 50000) -> tup
         text = text.split("```", 1)[1].split("```", 1)[0].strip()
 
     try:
-        payload = json.loads(text)
-    except json.JSONDecodeError:
+        payload = orjson.loads(text)
+    except orjson.JSONDecodeError:
         payload = {"raw": text, "parse_error": True}
 
     normalized = _normalize_payload(payload)
@@ -215,6 +293,6 @@ def analyze_dom_with_llm(html: str, url: str, max_dom_chars: int = 50000) -> tup
     has_main = bool(normalized.get("main_content"))
     has_links = bool(normalized.get("links"))
     parse_error = bool(payload.get("parse_error"))
-    confidence = 0.95 if (has_main and has_links and not parse_error) else 0.62
+    confidence = LLM_SUCCESS_CONFIDENCE if (has_main and has_links and not parse_error) else 0.62
 
     return (normalized, confidence)
@@ -2,11 +2,15 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Any
-from urllib.parse import urljoin, urlparse, urlunparse
+from urllib.parse import urljoin, urlparse
+import heapq
 import math
 import re
 
+from selectolax.lexbor import LexborHTMLParser
+
 
 GEO_TERMS = {
     "map",
@@ -54,12 +58,23 @@ NOISE_TERMS = {
     "sponsor",
 }
 
+# Tuples iterate faster than sets; plain `in` over each term stays well ahead of a
+# regex alternation here (and keeps substring semantics, e.g. "map" in "mapping").
+_GEO_TERMS = tuple(sorted(GEO_TERMS))
+_NOISE_TERMS = tuple(sorted(NOISE_TERMS))
+_GEO_DENOM = max(1, len(_GEO_TERMS) * 0.35)
+_NOISE_DENOM = max(1, len(_NOISE_TERMS) * 0.35)
+_STRUCT_TERMS = ("schema.org", "geo", "latitude", "longitude")
+_YEAR_RE = re.compile(r"\b(?:202[4-9]|203\d)\b")
+# Links past this point of a page are rarely worth the parse; lexbor copes with the cut markup.
+_MAX_LINK_SCAN_CHARS = 500_000
+
 
 def _clamp(value: float, low: float = 0.0, high: float = 1.0) -> float:
     return max(low, min(high, value))
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class FrontierCandidate:
     url: str
     geo_score: float
@@ -67,7 +82,7 @@ class FrontierCandidate:
     reason: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class GeoSignals:
     geo_term_density: float
     freshness_signal: float
@@ -85,22 +100,35 @@ class GeoSignals:
         return _clamp(score)
 
 
+# Nav/footer links repeat across every page a worker crawls; ParseResult is an
+# immutable tuple, so parses and canonical forms are safe to share.
+_parse_cached = lru_cache(maxsize=20000)(urlparse)
+
+
+@lru_cache(maxsize=20000)
 def canonicalize_url(url: str) -> str:
-    parsed = urlparse(url.strip())
-    if parsed.scheme not in {"http", "https"}:
+    parsed = _parse_cached(url.strip())
+    # Host-less forms like "http:foo" are not fetchable.
+    if parsed.scheme not in {"http", "https"} or not parsed.netloc:
         return ""
     netloc = parsed.netloc.lower()
     path = parsed.path or "/"
-    cleaned = urlunparse((parsed.scheme, netloc, path, "", parsed.query, ""))
+    if parsed.query:
+        cleaned = f"{parsed.scheme}://{netloc}{path}?{parsed.query}"
+    else:
+        cleaned = f"{parsed.scheme}://{netloc}{path}"
+    # Whitespace in front of a dropped "#frag" or ";params" survives one pass; recanonicalize
+    # so the result is a fixed point and callers never need to canonicalize twice.
+    if cleaned[-1].isspace():
+        return canonicalize_url(cleaned)
     return cleaned
 
 
-def _keyword_hits(text: str, words: set[str]) -> float:
-    lowered = text.lower()
+def _keyword_hits(lowered: str, words: tuple[str, ...], denom: float) -> float:
+    """Fraction of `words` found in `lowered`, which callers must already have lowercased."""
     if not lowered:
         return 0.0
-    hits = sum(1 for word in words if word in lowered)
-    return hits / max(1, len(words) * 0.35)
+    return len([word for word in words if word in lowered]) / denom
 
 
 def compute_geo_signals(url: str, payload: dict[str, Any]) -> GeoSignals:
@@ -109,17 +137,18 @@ def compute_geo_signals(url: str, payload: dict[str, Any]) -> GeoSignals:
     description = str(payload.get("description") or "")
     blob = f"{url}\n{title}\n{description}\n{main_content[:5000]}"
 
-    geo_density = _clamp(_keyword_hits(blob, GEO_TERMS) * 3.4)
+    geo_density = _clamp(_keyword_hits(blob.lower(), _GEO_TERMS, _GEO_DENOM) * 3.4)
     freshness_signal = 0.0
     if payload.get("article_date"):
         freshness_signal = 0.65
-    if re.search(r"\b(202[4-9]|203\d)\b", blob):
+    if _YEAR_RE.search(blob):
         freshness_signal = max(freshness_signal, 0.8)
 
     structured_signal = 0.0
-    if "application/ld+json" in main_content.lower():
+    content_lower = main_content.lower()
+    if "application/ld+json" in content_lower:
         structured_signal = 0.7
-    if any(k in main_content.lower() for k in ("schema.org", "geo", "latitude", "longitude")):
+    if any(k in content_lower for k in _STRUCT_TERMS):
         structured_signal = max(structured_signal, 0.6)
 
     links = payload.get("links") or []
@@ -127,7 +156,9 @@ def compute_geo_signals(url: str, payload: dict[str, Any]) -> GeoSignals:
     for link in links:
         href = str(link.get("href") or "")
         text = str(link.get("text") or "")
-        if any(term in f"{href} {text}".lower() for term in GEO_TERMS):
+        # Build the lowered blob once per link, not once per term inside the generator.
+        blob_lower = f"{href} {text}".lower()
+        if any(term in blob_lower for term in _GEO_TERMS):
             strong += 1
     quality_signal = _clamp(strong / max(1, min(len(links), 15)))
 
@@ -145,48 +176,53 @@ def extract_links(html: str, base_url: str, max_links: int = 80) -> list[dict[st
     if not html:
         return out
 
-    for m in re.finditer(
-        r'<a\s+[^>]*href=["\']([^"\']+)["\'][^>]*>(.*?)</a>',
-        html,
-        re.IGNORECASE | re.DOTALL,
-    ):
-        href_raw = m.group(1).strip()
-        anchor_html = m.group(2)
-        anchor_text = re.sub(r"<[^>]+>", " ", anchor_html)
-        anchor_text = " ".join(anchor_text.split())[:220]
+    # One linear lexbor parse instead of a backtracking regex over the whole page
+    # plus a tag-stripping regex per anchor.
+    for node in LexborHTMLParser(html[:_MAX_LINK_SCAN_CHARS]).css("a[href]"):
+        href_raw = (node.attributes.get("href") or "").strip()
+        if not href_raw:
+            continue
         abs_url = canonicalize_url(urljoin(base_url, href_raw))
         if not abs_url or abs_url in seen:
             continue
         seen.add(abs_url)
+        anchor_text = " ".join(node.text(separator=" ").split())[:220]
         out.append({"href": abs_url, "text": anchor_text})
         if len(out) >= max_links:
             break
     return out
 
 
-def _host_affinity(parent_url: str, candidate_url: str) -> float:
-    parent_host = urlparse(parent_url).netloc.lower()
-    cand_host = urlparse(candidate_url).netloc.lower()
+def _host_affinity(parent_host: str, parent_suffix: list[str], cand_host: str) -> float:
     if not parent_host or not cand_host:
         return 0.0
     if parent_host == cand_host:
         return 1.0
-    if parent_host.split(".")[-2:] == cand_host.split(".")[-2:]:
+    if parent_suffix == cand_host.split(".")[-2:]:
         return 0.78
     return 0.45
 
 
+def _parent_host_parts(parent_url: str) -> tuple[str, list[str]]:
+    parent_host = _parse_cached(parent_url).netloc.lower()
+    return parent_host, parent_host.split(".")[-2:]
+
+
 def score_frontier_candidate(parent_url: str, href: str, text: str = "") -> tuple[float, str]:
+    return _score_candidate(*_parent_host_parts(parent_url), href, text)
+
+
+def _score_candidate(parent_host: str, parent_suffix: list[str], href: str, text: str) -> tuple[float, str]:
     blob = f"{href} {text}".lower()
-    geo = _clamp(_keyword_hits(blob, GEO_TERMS) * 3.7)
-    noise = _clamp(_keyword_hits(blob, NOISE_TERMS) * 2.6)
+    geo = _clamp(_keyword_hits(blob, _GEO_TERMS, _GEO_DENOM) * 3.7)
+    noise = _clamp(_keyword_hits(blob, _NOISE_TERMS, _NOISE_DENOM) * 2.6)
     depth_penalty = 0.0
-    path = urlparse(href).path
-    slash_count = path.count("/")
+    parsed = _parse_cached(href)
+    slash_count = parsed.path.count("/")
     if slash_count > 5:
         depth_penalty = min(0.28, (slash_count - 5) * 0.05)
 
-    host = _host_affinity(parent_url, href)
+    host = _host_affinity(parent_host, parent_suffix, parsed.netloc.lower())
     score = geo * 0.62 + host * 0.28 + (1.0 - noise) * 0.10 - depth_penalty
     score = _clamp(score)
 
@@ -210,34 +246,39 @@ def frontier_candidates(
     max_depth: int,
     max_links: int,
     page_geo_score: float,
+    min_geo_score: float = 0.0,
 ) -> list[FrontierCandidate]:
     if current_depth >= max_depth:
         return []
+    # Link scores are at most 1.0, so no candidate can clear min_geo_score on this page.
+    if _clamp(0.72 + page_geo_score * 0.28) < min_geo_score:
+        return []
 
-    links: list[dict[str, str]] = []
-    payload_links = payload.get("links") or []
-    for link in payload_links:
-        href = canonicalize_url(str(link.get("href") or ""))
-        if not href:
-            continue
-        text = str(link.get("text") or "")[:220]
-        links.append({"href": href, "text": text})
-
-    if len(links) < max_links // 2:
-        links.extend(extract_links(html, parent_url, max_links=max_links))
-
+    # Single pass: hrefs are canonicalized once and the first text seen for a URL wins.
     dedup: dict[str, str] = {}
-    for link in links:
-        href = canonicalize_url(link.get("href", ""))
+    payload_count = 0
+    for link in payload.get("links") or []:
+        href = canonicalize_url(str(link.get("href") or ""))
         if not href:
             continue
+        payload_count += 1
         if href not in dedup:
-            dedup[href] = link.get("text", "")
+            dedup[href] = str(link.get("text") or "")[:220]
 
+    if payload_count < max_links // 2:
+        # extract_links already returns canonical, non-empty hrefs.
+        for link in extract_links(html, parent_url, max_links=max_links):
+            if link["href"] not in dedup:
+                dedup[link["href"]] = link["text"]
+
+    # The parent host is the same for every link; split it once per page.
+    parent_host, parent_suffix = _parent_host_parts(parent_url)
     out: list[FrontierCandidate] = []
     for href, text in dedup.items():
-        score, reason = score_frontier_candidate(parent_url, href, text)
+        score, reason = _score_candidate(parent_host, parent_suffix, href, text)
         blended_score = _clamp(score * 0.72 + page_geo_score * 0.28)
+        if blended_score < min_geo_score:
+            continue
         priority = int(math.ceil(blended_score * 100.0)) + max(0, 20 - current_depth * 6)
         out.append(
             FrontierCandidate(
@@ -248,5 +289,6 @@ def frontier_candidates(
             )
         )
 
-    out.sort(key=lambda item: (item.geo_score, item.priority), reverse=True)
-    return out[:max_links]
+    # Same result as a stable descending sort sliced to max_links, in O(n log k). Filtering
+    # on geo_score first cannot change it: geo_score is the leading sort key.
+    return heapq.nlargest(max_links, out, key=lambda item: (item.geo_score, item.priority))
@@ -2,13 +2,14 @@
 from __future__ import annotations
 
 import argparse
+import heapq
 import math
 import random
 import statistics
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
-@dataclass
+@dataclass(slots=True)
 class Region:
     region_id: str
     zone: str
@@ -17,7 +18,7 @@ class Region:
     last_refresh: int = 0
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Shard:
     shard_id: str
     region_id: str
@@ -33,7 +34,7 @@ class Shard:
         return max(0, tick - self.created_tick)
 
 
-@dataclass
+@dataclass(slots=True)
 class Worker:
     worker_id: str
     zone: str
@@ -41,9 +42,17 @@ class Worker:
     tflops: float
     bandwidth: float
     busy_ms: float = 0.0
+    # Per-worker job cost factors, fixed at construction; _job_ms runs for every
+    # (worker, shard) pair each tick.
+    compute_factor: float = field(init=False, repr=False)
+    io_cost: float = field(init=False, repr=False)
 
+    def __post_init__(self) -> None:
+        self.compute_factor = 34.0 / self.tflops
+        self.io_cost = max(0.45, 1.3 - self.bandwidth / 220.0)
 
-@dataclass
+
+@dataclass(slots=True)
 class Summary:
     name: str
     processed: float
@@ -62,34 +71,41 @@ def _clamp(v: float, low: float = 0.0, high: float = 1.0) -> float:
 def _poisson(lam: float, rng: random.Random) -> int:
     if lam <= 0:
         return 0
+    # Knuth's product-of-uniforms method. The number of draws is part of the seeded
+    # stream every later shard depends on, so keep it draw-for-draw.
     threshold = math.exp(-lam)
+    draw = rng.random
     k = 0
     p = 1.0
     while p > threshold:
         k += 1
-        p *= rng.random()
+        p *= draw()
     return max(0, k - 1)
 
 
+_ZONES = ("west", "central", "east")
+_TRANSFER_MS = {
+    ("west", "west"): 8.0,
+    ("central", "central"): 8.0,
+    ("east", "east"): 8.0,
+    ("west", "central"): 20.0,
+    ("central", "west"): 20.0,
+    ("central", "east"): 20.0,
+    ("east", "central"): 20.0,
+}
+
+
 def _job_ms(worker: Worker, shard: Shard) -> tuple[float, float]:
-    if worker.zone == shard.zone:
-        transfer = 8.0
-    elif {worker.zone, shard.zone} in ({"west", "central"}, {"central", "east"}):
-        transfer = 20.0
-    else:
-        transfer = 37.0
-    compute = 34.0 / worker.tflops
-    io = max(0.45, 1.3 - worker.bandwidth / 220.0)
-    return shard.train_ms * compute + shard.ingest_ms * io + transfer, transfer
+    transfer = _TRANSFER_MS.get((worker.zone, shard.zone), 37.0)
+    return shard.train_ms * worker.compute_factor + shard.ingest_ms * worker.io_cost + transfer, transfer
 
 
 def _make_regions(n: int, rng: random.Random) -> dict[str, Region]:
-    zones = ("west", "central", "east")
     out: dict[str, Region] = {}
     for i in range(n):
         out[f"R-{i:03d}"] = Region(
             region_id=f"R-{i:03d}",
-            zone=zones[i % len(zones)],
+            zone=_ZONES[i % len(_ZONES)],
             uncertainty=rng.uniform(0.46, 0.88),
             motion=rng.uniform(0.16, 0.84),
         )
@@ -97,13 +113,12 @@ def _make_regions(n: int, rng: random.Random) -> dict[str, Region]:
 
 
 def _make_workers(n: int, rng: random.Random) -> list[Worker]:
-    zones = ("west", "central", "east")
     out = []
     for i in range(n):
         out.append(
             Worker(
                 worker_id=f"W-{i:02d}",
-                zone=zones[i % len(zones)],
+                zone=_ZONES[i % len(_ZONES)],
                 vram_gb=round(rng.uniform(8.0, 24.0), 2),
                 tflops=round(rng.uniform(32.0, 64.0), 2),
                 bandwidth=round(rng.uniform(80.0, 240.0), 2),
@@ -113,11 +128,15 @@ def _make_workers(n: int, rng: random.Random) -> list[Worker]:
 
 
 def _drift(regions: dict[str, Region], tick: int, rng: random.Random) -> None:
+    # Called every tick for every region: keep the per-region body to inline min/max
+    # and hoist the tick-level checks. RNG draw order is unchanged.
+    perturb = tick % 8 == 0
+    uniform = rng.uniform
     for region in regions.values():
-        staleness = tick - region.last_refresh
-        region.uncertainty = _clamp(region.uncertainty + 0.004 + region.motion * 0.018 + staleness * 0.0007, 0.02, 0.99)
-        if tick % 8 == 0:
-            region.motion = _clamp(region.motion + rng.uniform(-0.04, 0.08), 0.03, 1.0)
+        u = region.uncertainty + 0.004 + region.motion * 0.018 + (tick - region.last_refresh) * 0.0007
+        region.uncertainty = max(0.02, min(0.99, u))
+        if perturb:
+            region.motion = max(0.03, min(1.0, region.motion + uniform(-0.04, 0.08)))
     if tick % 42 == 0:
         hot = rng.choice(list(regions.values()))
         hot.motion = _clamp(hot.motion + 0.24, 0.03, 1.0)
@@ -132,20 +151,25 @@ def _emit_shards(
     max_per_tick: int,
 ) -> tuple[list[Shard], int]:
     out: list[Shard] = []
+    surge = tick % 50 in (0, 1)
+    uniform = rng.uniform
+    randint = rng.randint
     for region in regions.values():
-        rate = 0.08 + 0.55 * region.motion
-        if tick % 50 in (0, 1) and region.zone == "central":
+        motion = region.motion
+        rate = 0.08 + 0.55 * motion
+        if surge and region.zone == "central":
             rate += 0.4
         events = min(2, _poisson(rate, rng))
+        if not events:
+            continue
+        entropy_scale = 0.48 + 0.65 * motion
+        novelty_scale = 0.35 + 0.8 * region.uncertainty
         for _ in range(events):
             counter += 1
-            entropy = _clamp(rng.uniform(0.2, 0.96) * (0.48 + 0.65 * region.motion), 0.05, 0.99)
-            novelty = _clamp(rng.uniform(0.2, 1.0) * (0.35 + 0.8 * region.uncertainty), 0.05, 0.99)
-            points = rng.uniform(1.2, 15.5)
-            images = rng.randint(700, 3600)
-            vram = round(1.1 + points * 0.22 + images / 4200 + entropy * 0.7, 2)
-            ingest = 40 + images * 0.035 + points * 9.5
-            train = 95 + points * 18 + images * 0.06
+            entropy = max(0.05, min(0.99, uniform(0.2, 0.96) * entropy_scale))
+            novelty = max(0.05, min(0.99, uniform(0.2, 1.0) * novelty_scale))
+            points = uniform(1.2, 15.5)
+            images = randint(700, 3600)
             out.append(
                 Shard(
                     shard_id=f"S-{counter:06d}",
@@ -154,9 +178,9 @@ def _emit_shards(
                     created_tick=tick,
                     entropy=entropy,
                     novelty=novelty,
-                    vram_gb=vram,
-                    ingest_ms=ingest,
-                    train_ms=train,
+                    vram_gb=round(1.1 + points * 0.22 + images / 4200 + entropy * 0.7, 2),
+                    ingest_ms=40 + images * 0.035 + points * 9.5,
+                    train_ms=95 + points * 18 + images * 0.06,
                 )
             )
     if len(out) > max_per_tick:
@@ -208,33 +232,44 @@ def _run_once(name: str, adaptive: bool, *, seed: int, ticks: int, regions_n: in
         available = [w for w in workers if w.busy_ms <= 0]
 
         if adaptive:
-            candidates: list[tuple[float, Worker, Shard, float, float]] = []
-            for w in available:
-                for s in queue:
-                    if s.vram_gb > w.vram_gb:
-                        continue
+            # Keyed (-score, insertion index) so heap pops follow the same order as a
+            # stable descending sort on score, without comparing Worker/Shard objects.
+            candidates: list[tuple[float, int, Worker, int, Shard, float, float]] = []
+            # Everything except locality and job duration depends only on the shard
+            # (or the tick), so score it once per shard rather than once per pair.
+            pressure = min(0.16, len(queue) / 900.0)
+            shard_terms: list[tuple[int, Shard, float, float]] = []
+            if available:
+                for idx, s in enumerate(queue):
                     region = regions[s.region_id]
-                    duration, _ = _job_ms(w, s)
                     freshness = math.exp(-s.age(tick) / 11.0)
                     staleness = min(1.0, (tick - region.last_refresh) / 35.0)
                     urgency = 0.52 * region.uncertainty + 0.33 * region.motion + 0.15 * staleness
                     signal = 0.54 * s.entropy + 0.46 * s.novelty
+                    base = urgency * 0.5 + signal * 0.35 + freshness * 0.15
+                    gain_base = (urgency * 0.62 + signal * 0.38) * freshness
+                    shard_terms.append((idx, s, base, gain_base))
+            for w in available:
+                for idx, s, base, gain_base in shard_terms:
+                    if s.vram_gb > w.vram_gb:
+                        continue
+                    duration, _ = _job_ms(w, s)
                     locality = 1.11 if w.zone == s.zone else 0.96
                     efficiency = 1.0 / (1.0 + duration / 260.0)
-                    pressure = min(0.16, len(queue) / 900.0)
-                    score = (urgency * 0.5 + signal * 0.35 + freshness * 0.15) * locality
-                    score = score * efficiency + pressure
-                    gain = (urgency * 0.62 + signal * 0.38) * freshness * locality
-                    candidates.append((score, w, s, duration, gain))
+                    score = base * locality * efficiency + pressure
+                    candidates.append((-score, len(candidates), w, idx, s, duration, gain_base * locality))
 
-            candidates.sort(reverse=True, key=lambda row: row[0])
+            # At most one pick per available worker, so pop lazily instead of sorting
+            # every pair.
+            heapq.heapify(candidates)
             used_worker = set()
-            used_shard = set()
-            for _, w, s, duration, gain in candidates:
-                if w.worker_id in used_worker or s.shard_id in used_shard:
+            used_shard: set[int] = set()
+            while candidates and len(used_worker) < len(available):
+                _, _, w, idx, s, duration, gain = heapq.heappop(candidates)
+                if w.worker_id in used_worker or idx in used_shard:
                     continue
                 used_worker.add(w.worker_id)
-                used_shard.add(s.shard_id)
+                used_shard.add(idx)
 
                 w.busy_ms = duration
                 processed += 1
@@ -247,10 +282,18 @@ def _run_once(name: str, adaptive: bool, *, seed: int, ticks: int, regions_n: in
                 r.motion = _clamp(r.motion - gain * 0.012 + rng.uniform(-0.012, 0.01), 0.03, 1.0)
                 r.last_refresh = tick
 
-            queue = [s for s in queue if s.shard_id not in used_shard]
+            # A handful of picks per tick: delete them in place (highest index first so
+            # earlier indices stay valid) rather than rebuilding the whole queue.
+            for idx in sorted(used_shard, reverse=True):
+                del queue[idx]
         else:
-            queue.sort(key=lambda s: s.created_tick)
+            # The queue is already in created_tick order: shards are appended per tick,
+            # picks only remove, and the overflow trim below sorts oldest-first.
             for w in available:
+                if not queue:
+                    break
+                # Shards top out near 6.1 GB and workers start at 8 GB, so this scan
+                # normally stops at index 0; the loop only guards custom sizes.
                 pick_idx = -1
                 for idx, s in enumerate(queue):
                     if s.vram_gb <= w.vram_gb:
@@ -3,47 +3,143 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import multiprocessing
+import queue
 import signal
 import time
-from dataclasses import dataclass
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from itertools import islice
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Callable, Sequence, TypeVar
+
+try:
+    import uvloop
+except ImportError:  # uvloop is optional (not available on Windows)
+    uvloop = None
 
 from .config import (
+    get_analysis_processes,
     get_batch_size,
+    get_batch_size_max,
+    get_crawl_concurrency,
     get_frontier_max_depth,
     get_frontier_max_links,
     get_geo_score_threshold,
     get_metrics_flush_every,
+    get_target_p95_ms,
     get_worker_id,
 )
-from .crawler import get_page_html
+from .crawler import close_browser, get_page_html
 from .db import (
     claim_pending_urls,
     close_pool,
+    finalize_page,
+    get_cached_analysis,
     get_pool,
-    insert_extraction,
-    insert_raw_page,
-    mark_url_done,
     mark_url_failed,
-    queue_depth,
+    put_cached_analysis,
+    queue_depth_cached,
     record_worker_metrics,
-    upsert_discovered_url,
+    upsert_discovered_urls,
 )
-from .dom_analyzer import analyze_dom_with_llm
+from .dom_analyzer import LLM_SUCCESS_CONFIDENCE, analysis_cache_key, analyze_dom_with_llm
 from .frontier import compute_geo_signals, frontier_candidates
 
-logging.basicConfig(level=logging.INFO)
+T = TypeVar("T")
+
 logger = logging.getLogger("stashy.worker")
 
 POLL_INTERVAL = 2.0
-RUN = True
+# p95 is reported over the most recent latencies so memory and sort cost stay bounded.
+LATENCY_WINDOW = 1024
+# Pending rows above which a worker that filled its last claim may claim more.
+BURST_QUEUE_DEPTH = 100
+# "frontier:<reason>" source labels, built once per distinct candidate reason.
+_SOURCE_BY_REASON: dict[str, str] = {}
+# Set by run_worker; process_one falls back to a thread when it runs standalone.
+_analysis_executor: ProcessPoolExecutor | None = None
+_analysis_workers = 1
+
+
+def _install_stop_handlers(stop: asyncio.Event, stack: AsyncExitStack) -> None:
+    """Set `stop` on SIGINT/SIGTERM until `stack` unwinds."""
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+            stack.callback(loop.remove_signal_handler, sig)
+        except NotImplementedError:  # Windows event loops have no add_signal_handler
+            previous = signal.signal(sig, lambda *_: loop.call_soon_threadsafe(stop.set))
+            stack.callback(signal.signal, sig, previous)
+
+
+async def _idle(stop: asyncio.Event, seconds: float) -> None:
+    """Sleep up to `seconds`, returning at once when the worker is asked to stop."""
+    try:
+        await asyncio.wait_for(stop.wait(), seconds)
+    except TimeoutError:
+        pass
+
+
+def _new_analysis_executor() -> ProcessPoolExecutor:
+    # spawn, not fork: the parent already holds an event loop, DB sockets and threads.
+    return ProcessPoolExecutor(
+        max_workers=_analysis_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_analysis_process,
+    )
+
+
+def _replace_broken_executor(broken: ProcessPoolExecutor) -> None:
+    """Swap in a fresh pool once, however many in-flight analyses saw `broken` fail."""
+    global _analysis_executor
+    if _analysis_executor is broken:
+        _analysis_executor = _new_analysis_executor()
+        # wait=False: the dead pool's futures have already failed; don't block the loop.
+        broken.shutdown(wait=False, cancel_futures=True)
 
 
-def _shutdown(*_):
-    global RUN
-    RUN = False
+def _pool_safe(fn: Callable[..., T], *args: Any) -> T:
+    """
+    Run `fn` in a pool child, re-raising any failure as a RuntimeError. Exceptions travel
+    back pickled, and one the parent can't rebuild (openai's RateLimitError needs a
+    response object) makes CPython mark the whole pool broken.
+    """
+    try:
+        return fn(*args)
+    except Exception as exc:
+        raise RuntimeError(f"{type(exc).__name__}: {exc}") from None
+
+
+async def _analyze_in_pool(html: str, url: str) -> tuple[dict, float]:
+    loop = asyncio.get_running_loop()
+    executor = _analysis_executor
+    try:
+        return await loop.run_in_executor(executor, _pool_safe, analyze_dom_with_llm, html, url)
+    except BrokenProcessPool:
+        # A child died (e.g. OOM-killed on a huge page); the pool refuses all later work.
+        logger.warning("Analysis process pool broke on %s; restarting it and retrying once", url)
+        _replace_broken_executor(executor)
+        return await loop.run_in_executor(_analysis_executor, _pool_safe, analyze_dom_with_llm, html, url)
 
 
-@dataclass
+def _close_analysis_executor() -> None:
+    global _analysis_executor
+    executor, _analysis_executor = _analysis_executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _init_analysis_process() -> None:
+    # Ctrl-C reaches the whole process group; the parent drains and shuts the pool down.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+@dataclass(slots=True)
 class WorkerCounters:
     processed: int = 0
     failed: int = 0
@@ -51,22 +147,80 @@ class WorkerCounters:
     frontier_new: int = 0
 
 
-@dataclass
-class WorkerRuntime:
-    latencies_ms: list[float]
+@dataclass(slots=True, frozen=True)
+class FrontierLimits:
+    """Frontier settings, read once per worker instead of once per page."""
 
+    max_depth: int
+    max_links: int
+    min_geo_score: float
 
-def _p95(values: list[float]) -> float:
+    @classmethod
+    def from_config(cls) -> FrontierLimits:
+        return cls(
+            max_depth=get_frontier_max_depth(),
+            max_links=get_frontier_max_links(),
+            min_geo_score=get_geo_score_threshold(),
+        )
+
+
+@dataclass(slots=True)
+class WorkerRuntime:
+    latencies_ms: deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+    latency_sum_ms: float = 0.0
+    latency_count: int = 0
+
+    def record_latency(self, elapsed_ms: float) -> None:
+        self.latencies_ms.append(elapsed_ms)
+        self.latency_sum_ms += elapsed_ms
+        self.latency_count += 1
+
+
+@dataclass(slots=True)
+class AdaptiveBatcher:
+    """
+    Claim size per loop: doubles while the queue is deep and batches come back full,
+    halves when batch p95 overshoots the target, and otherwise drifts back to base.
+    """
+
+    base_size: int
+    min_size: int
+    max_size: int
+    target_p95_ms: float
+    size: int = 0
+    queue_depth: int = 0
+
+    def __post_init__(self) -> None:
+        self.size = self.size or self.base_size
+
+    def optimal_size(self) -> int:
+        return self.size
+
+    def record(self, claimed: int, p95_ms: float, queue_depth: int | None = None) -> None:
+        if queue_depth is not None:
+            self.queue_depth = queue_depth
+        if p95_ms > self.target_p95_ms:
+            self.size = max(self.min_size, self.size // 2)
+        elif claimed >= self.size and self.queue_depth > BURST_QUEUE_DEPTH:
+            self.size = min(self.max_size, self.size * 2)
+        elif self.size > self.base_size:
+            self.size = max(self.base_size, self.size // 2)
+        elif self.size < self.base_size:
+            self.size = min(self.base_size, self.size * 2)
+
+
+def _p95(values: Sequence[float]) -> float:
     if not values:
         return 0.0
+    # A full C sort of the <=LATENCY_WINDOW values beats heapq.nlargest(n - idx) selection
+    # at every window size, despite the better asymptotics; statistics.quantiles sorts too.
     ordered = sorted(values)
     idx = int(0.95 * (len(ordered) - 1))
     return ordered[idx]
 
 
-async def _enqueue_frontier(
+def _frontier_rows(
     *,
-    parent_url_id: int,
     parent_url: str,
     payload: dict,
     html: str,
@@ -75,8 +229,9 @@ async def _enqueue_frontier(
     max_depth: int,
     max_links: int,
     min_geo_score: float,
-    counters: WorkerCounters,
-) -> int:
+) -> list[tuple[str, int, float, str, int]]:
+    if current_depth >= max_depth:
+        return []
     candidates = frontier_candidates(
         parent_url=parent_url,
         payload=payload,
@@ -85,30 +240,28 @@ async def _enqueue_frontier(
         max_depth=max_depth,
         max_links=max_links,
         page_geo_score=page_geo_score,
+        min_geo_score=min_geo_score,
     )
-
-    enqueued = 0
-    for cand in candidates:
-        if cand.geo_score < min_geo_score:
-            continue
-        inserted = await upsert_discovered_url(
-            parent_url_id=parent_url_id,
-            url=cand.url,
-            priority=cand.priority,
-            geo_score=cand.geo_score,
-            source=f"frontier:{cand.reason}",
-            depth=current_depth + 1,
+    depth = current_depth + 1
+    sources = _SOURCE_BY_REASON
+    return [
+        (
+            cand.url,
+            cand.priority,
+            cand.geo_score,
+            sources.get(cand.reason) or sources.setdefault(cand.reason, f"frontier:{cand.reason}"),
+            depth,
         )
-        counters.frontier_enqueued += 1
-        if inserted:
-            counters.frontier_new += 1
-        enqueued += 1
-    return enqueued
+        for cand in candidates
+        # A self-link would flip the page just marked done back to pending.
+        if cand.url != parent_url
+    ]
 
 
-async def _record_metrics(worker_id: str, counters: WorkerCounters, runtime: WorkerRuntime) -> None:
-    avg_latency = sum(runtime.latencies_ms) / len(runtime.latencies_ms) if runtime.latencies_ms else 0.0
-    pending_depth = await queue_depth()
+async def _record_metrics(worker_id: str, counters: WorkerCounters, runtime: WorkerRuntime) -> int:
+    """Write a metrics row; returns the queue depth it sampled."""
+    avg_latency = runtime.latency_sum_ms / runtime.latency_count if runtime.latency_count else 0.0
+    pending_depth = await queue_depth_cached()
     await record_worker_metrics(
         worker_id=worker_id,
         processed_count=counters.processed,
@@ -118,55 +271,126 @@ async def _record_metrics(worker_id: str, counters: WorkerCounters, runtime: Wor
         p95_latency_ms=_p95(runtime.latencies_ms),
         current_queue_depth=pending_depth,
     )
+    return pending_depth
 
 
-async def process_one(row: dict, counters: WorkerCounters, runtime: WorkerRuntime) -> None:
-    url_id = int(row["id"])
-    url = str(row["url"])
-    depth = int(row.get("depth") or 0)
+async def _analyze(html: str, url: str) -> tuple[dict, float]:
+    """analyze_dom_with_llm behind the llm_cache table; cache errors only cost the lookup."""
+    key = analysis_cache_key(html, url)
+    if key is not None:
+        try:
+            cached = await get_cached_analysis(key)
+        except Exception as exc:
+            cached = None
+            logger.warning("LLM cache lookup failed for %s: %s", url, exc)
+        if cached is not None:
+            return cached
+
+    # Blocking LLM HTTP call or CPU-bound lexbor fallback: run it in the process pool so
+    # parsing uses every core and the event loop keeps fetching and writing.
+    if _analysis_executor is not None:
+        payload, confidence = await _analyze_in_pool(html, url)
+    else:
+        payload, confidence = await asyncio.to_thread(analyze_dom_with_llm, html, url)
+
+    # Only complete extractions are cached: the insert never overwrites, so caching a
+    # malformed reply would pin it for that HTML and re-crawls would never retry the LLM.
+    if key is not None and confidence >= LLM_SUCCESS_CONFIDENCE:
+        try:
+            await put_cached_analysis(key, payload, confidence)
+        except Exception as exc:
+            logger.warning("LLM cache store failed for %s: %s", url, exc)
+    return payload, confidence
+
+
+@dataclass(slots=True)
+class PageJob:
+    """One claimed URL as it moves through the fetch, analyze and write stages."""
+
+    url_id: int
+    url: str
+    depth: int
+    start: float
+    html: str = ""
+    status_code: int | None = None
+    content_type: str | None = None
+    payload: dict = field(default_factory=dict)
+    confidence: float = 0.0
+
+    @classmethod
+    def from_row(cls, row: dict) -> PageJob:
+        return cls(
+            url_id=int(row["id"]),
+            url=str(row["url"]),
+            depth=int(row.get("depth") or 0),
+            start=time.perf_counter(),
+        )
 
-    start = time.perf_counter()
 
+async def _fetch_stage(job: PageJob, counters: WorkerCounters) -> bool:
     try:
-        html, status_code, content_type = await get_page_html(url)
+        html, job.status_code, job.content_type = await get_page_html(job.url)
     except Exception as exc:
         counters.failed += 1
-        await mark_url_failed(url_id, str(exc))
-        logger.warning("Fetch failed %s: %s", url, exc)
-        return
+        await mark_url_failed(job.url_id, str(exc))
+        logger.warning("Fetch failed %s: %s", job.url, exc)
+        return False
 
     if html is None:
         counters.failed += 1
-        await mark_url_failed(url_id, "fetch failed or timeout")
-        logger.warning("No HTML for %s", url)
-        return
+        await mark_url_failed(job.url_id, "fetch failed or timeout")
+        logger.warning("No HTML for %s", job.url)
+        return False
+    job.html = html
+    return True
 
-    try:
-        page_id = await insert_raw_page(url_id, url, html, status_code, content_type)
-    except Exception as exc:
-        counters.failed += 1
-        await mark_url_failed(url_id, f"insert raw_page failed: {exc}")
-        logger.warning("Insert raw_page failed %s: %s", url, exc)
-        return
 
+async def _analyze_stage(job: PageJob, counters: WorkerCounters) -> bool:
     try:
-        payload, confidence = analyze_dom_with_llm(html, url)
+        job.payload, job.confidence = await _analyze(job.html, job.url)
     except Exception as exc:
         counters.failed += 1
-        await mark_url_failed(url_id, f"dom analysis failed: {exc}")
-        logger.warning("Extraction failed %s: %s", url, exc)
-        return
+        await mark_url_failed(job.url_id, f"dom analysis failed: {exc}")
+        logger.warning("Extraction failed %s: %s", job.url, exc)
+        return False
+    return True
+
 
-    geo_signals = compute_geo_signals(url, payload)
+async def _write_stage(
+    job: PageJob,
+    counters: WorkerCounters,
+    runtime: WorkerRuntime,
+    limits: FrontierLimits,
+) -> None:
+    url_id, url = job.url_id, job.url
+    geo_signals = compute_geo_signals(url, job.payload)
     page_geo_score = geo_signals.aggregate_score
 
     try:
-        await insert_extraction(
+        frontier = _frontier_rows(
+            parent_url=url,
+            payload=job.payload,
+            html=job.html,
+            page_geo_score=page_geo_score,
+            current_depth=job.depth,
+            max_depth=limits.max_depth,
+            max_links=limits.max_links,
+            min_geo_score=limits.min_geo_score,
+        )
+    except Exception as exc:
+        frontier = []
+        logger.warning("Frontier extraction failed for %s: %s", url, exc)
+
+    try:
+        await finalize_page(
             url_id,
-            page_id,
+            url,
+            job.html,
+            job.status_code,
+            job.content_type,
             "spatial-default-v2",
-            payload,
-            confidence,
+            job.payload,
+            job.confidence,
             geo_score=page_geo_score,
             signals={
                 "geo_term_density": geo_signals.geo_term_density,
@@ -177,88 +401,195 @@ async def process_one(row: dict, counters: WorkerCounters, runtime: WorkerRuntim
         )
     except Exception as exc:
         counters.failed += 1
-        await mark_url_failed(url_id, f"insert extraction failed: {exc}")
-        logger.warning("Insert extraction failed %s: %s", url, exc)
+        await mark_url_failed(url_id, f"finalize page failed: {exc}")
+        logger.warning("Finalize page failed %s: %s", url, exc)
         return
 
+    # Kept out of finalize_page's statement: that statement also locks this page's row, so
+    # two in-flight pages linking to each other would deadlock. On its own the upsert
+    # locks rows in url order, which is the same order for every concurrent page.
     try:
-        frontier_count = await _enqueue_frontier(
-            parent_url_id=url_id,
-            parent_url=url,
-            payload=payload,
-            html=html,
-            page_geo_score=page_geo_score,
-            current_depth=depth,
-            max_depth=get_frontier_max_depth(),
-            max_links=get_frontier_max_links(),
-            min_geo_score=get_geo_score_threshold(),
-            counters=counters,
-        )
+        frontier_new = await upsert_discovered_urls(url_id, frontier)
+        frontier_count = len(frontier)
     except Exception as exc:
-        frontier_count = 0
+        frontier_new = frontier_count = 0
         logger.warning("Frontier enqueue failed for %s: %s", url, exc)
 
-    await mark_url_done(url_id)
+    counters.frontier_enqueued += frontier_count
+    counters.frontier_new += frontier_new
     counters.processed += 1
 
-    elapsed_ms = (time.perf_counter() - start) * 1000.0
-    runtime.latencies_ms.append(elapsed_ms)
+    elapsed_ms = (time.perf_counter() - job.start) * 1000.0
+    runtime.record_latency(elapsed_ms)
 
-    logger.info(
+    # Per-URL detail stays at DEBUG; metrics flushes report progress at INFO.
+    logger.debug(
         "Done %s (url_id=%s depth=%s geo=%.3f frontier=%s latency=%.1fms)",
         url[:120],
         url_id,
-        depth,
+        job.depth,
         page_geo_score,
         frontier_count,
         elapsed_ms,
     )
 
 
-async def run_worker() -> None:
+async def process_one(
+    row: dict,
+    counters: WorkerCounters,
+    runtime: WorkerRuntime,
+    limits: FrontierLimits | None = None,
+) -> None:
+    job = PageJob.from_row(row)
+    if await _fetch_stage(job, counters) and await _analyze_stage(job, counters):
+        await _write_stage(job, counters, runtime, limits or FrontierLimits.from_config())
+
+
+async def _process_batch(
+    rows: list[dict],
+    counters: WorkerCounters,
+    runtime: WorkerRuntime,
+    limits: FrontierLimits,
+    stop: asyncio.Event,
+    *,
+    fetchers: int,
+    analyzers: int,
+    writers: int,
+) -> None:
+    """
+    Run a claimed batch through fetch -> analyze -> write stages joined by bounded
+    queues, so page N+1 downloads while page N is parsed and page N-1 is written.
+    A stage's exit pushes one None per downstream worker; `stop` only halts new fetches,
+    so pages already fetched are still drained to the database.
+    """
+    fetch_q: asyncio.Queue[dict] = asyncio.Queue()
+    for row in rows:
+        fetch_q.put_nowait(row)
+    analyze_q: asyncio.Queue[PageJob | None] = asyncio.Queue(maxsize=analyzers)
+    write_q: asyncio.Queue[PageJob | None] = asyncio.Queue(maxsize=writers)
+
+    async def fetch_worker() -> None:
+        while not stop.is_set() and not fetch_q.empty():
+            row = fetch_q.get_nowait()
+            job = None
+            try:
+                job = PageJob.from_row(row)
+                if not await _fetch_stage(job, counters):
+                    continue
+            except Exception:
+                # Keep one bad row from cancelling the rest of the TaskGroup.
+                logger.exception("Processing %s crashed", row.get("url"))
+                continue
+            await analyze_q.put(job)
+
+    async def analyze_worker() -> None:
+        while (job := await analyze_q.get()) is not None:
+            try:
+                if not await _analyze_stage(job, counters):
+                    continue
+            except Exception:
+                logger.exception("Processing %s crashed", job.url)
+                continue
+            await write_q.put(job)
+
+    async def write_worker() -> None:
+        while (job := await write_q.get()) is not None:
+            try:
+                await _write_stage(job, counters, runtime, limits)
+            except Exception:
+                logger.exception("Processing %s crashed", job.url)
+
+    async def stage(worker, width: int, downstream: asyncio.Queue | None, downstream_width: int) -> None:
+        async with asyncio.TaskGroup() as tg:
+            for _ in range(width):
+                tg.create_task(worker())
+        if downstream is not None:
+            for _ in range(downstream_width):
+                await downstream.put(None)
+
+    async with asyncio.TaskGroup() as tg:
+        tg.create_task(stage(fetch_worker, fetchers, analyze_q, analyzers))
+        tg.create_task(stage(analyze_worker, analyzers, write_q, writers))
+        tg.create_task(stage(write_worker, writers, None, 0))
+
+
+async def run_worker(stop: asyncio.Event | None = None) -> None:
+    """Claim and process batches until `stop` is set (by SIGINT/SIGTERM when not given)."""
+    global _analysis_executor, _analysis_workers
     worker_id = get_worker_id()
     batch_size = get_batch_size()
+    batcher = AdaptiveBatcher(
+        base_size=batch_size,
+        min_size=1,
+        max_size=max(batch_size, get_batch_size_max()),
+        target_p95_ms=get_target_p95_ms(),
+    )
     metrics_every = max(1, get_metrics_flush_every())
+    concurrency = max(1, get_crawl_concurrency())
+    analyzers = max(1, get_analysis_processes())
+    limits = FrontierLimits.from_config()
 
     logger.info(
-        "Worker %s starting batch_size=%s max_depth=%s frontier_links=%s min_geo=%.2f",
+        "Worker %s starting batch_size=%s concurrency=%s analyzers=%s max_depth=%s frontier_links=%s min_geo=%.2f",
         worker_id,
         batch_size,
-        get_frontier_max_depth(),
-        get_frontier_max_links(),
-        get_geo_score_threshold(),
+        concurrency,
+        analyzers,
+        limits.max_depth,
+        limits.max_links,
+        limits.min_geo_score,
     )
 
-    await get_pool()
-
     counters = WorkerCounters()
-    runtime = WorkerRuntime(latencies_ms=[])
-
-    while RUN:
-        try:
-            rows = await claim_pending_urls(worker_id, batch_size)
-        except Exception as exc:
-            logger.exception("Claim failed: %s", exc)
-            await asyncio.sleep(POLL_INTERVAL)
-            continue
-
-        if not rows:
-            if counters.processed and counters.processed % metrics_every == 0:
-                try:
-                    await _record_metrics(worker_id, counters, runtime)
-                except Exception as exc:
-                    logger.warning("Metrics flush failed: %s", exc)
-            await asyncio.sleep(POLL_INTERVAL)
-            continue
-
-        for row in rows:
-            if not RUN:
-                break
-            await process_one(row, counters, runtime)
-
-            if counters.processed and counters.processed % metrics_every == 0:
+    runtime = WorkerRuntime()
+
+    # Unwinds in reverse on any exit: executor, then browser, then pool, then signal handlers.
+    async with AsyncExitStack() as stack:
+        if stop is None:
+            stop = asyncio.Event()
+            _install_stop_handlers(stop, stack)
+        await get_pool()
+        stack.push_async_callback(close_pool)
+        stack.push_async_callback(close_browser)
+        _analysis_workers = analyzers
+        _analysis_executor = _new_analysis_executor()
+        stack.callback(_close_analysis_executor)
+
+        while not stop.is_set():
+            try:
+                rows = await claim_pending_urls(worker_id, batcher.optimal_size())
+            except Exception as exc:
+                logger.exception("Claim failed: %s", exc)
+                await _idle(stop, POLL_INTERVAL)
+                continue
+
+            if not rows:
+                if counters.processed and counters.processed % metrics_every == 0:
+                    try:
+                        await _record_metrics(worker_id, counters, runtime)
+                    except Exception as exc:
+                        logger.warning("Metrics flush failed: %s", exc)
+                await _idle(stop, POLL_INTERVAL)
+                continue
+
+            processed_before = counters.processed
+            await _process_batch(
+                rows,
+                counters,
+                runtime,
+                limits,
+                stop,
+                fetchers=min(concurrency, len(rows)),
+                analyzers=min(analyzers, len(rows)),
+                writers=min(concurrency, len(rows)),
+            )
+
+            # Flush once per batch that crossed a metrics_every boundary, after all of the
+            # batch's URLs have settled.
+            pending_depth = None
+            if counters.processed // metrics_every > processed_before // metrics_every:
                 try:
-                    await _record_metrics(worker_id, counters, runtime)
+                    pending_depth = await _record_metrics(worker_id, counters, runtime)
                     logger.info(
                         "Metrics flushed processed=%s failed=%s frontier_new=%s",
                         counters.processed,
@@ -268,12 +599,16 @@ async def run_worker() -> None:
                 except Exception as exc:
                     logger.warning("Metrics flush failed: %s", exc)
 
-    try:
-        await _record_metrics(worker_id, counters, runtime)
-    except Exception as exc:
-        logger.warning("Final metrics flush failed: %s", exc)
+            batch_done = counters.processed - processed_before
+            # Newest-first slice of the window: copies batch_done floats, not the whole window.
+            recent = list(islice(reversed(runtime.latencies_ms), batch_done))
+            batcher.record(len(rows), _p95(recent), pending_depth)
+
+        try:
+            await _record_metrics(worker_id, counters, runtime)
+        except Exception as exc:
+            logger.warning("Final metrics flush failed: %s", exc)
 
-    await close_pool()
     logger.info(
         "Worker %s stopped processed=%s failed=%s frontier_enqueued=%s frontier_new=%s",
         worker_id,
@@ -284,10 +619,30 @@ async def run_worker() -> None:
     )
 
 
+def _start_logging() -> QueueListener:
+    """
+    Root logging through a queue: logging calls on the event loop only enqueue the
+    record, and a listener thread formats it and writes it to stderr.
+    """
+    records: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    stream = logging.StreamHandler()
+    stream.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    root = logging.getLogger()
+    root.handlers[:] = [QueueHandler(records)]
+    root.setLevel(logging.INFO)
+    listener = QueueListener(records, stream)
+    listener.start()
+    return listener
+
+
 def main() -> None:
-    signal.signal(signal.SIGINT, _shutdown)
-    signal.signal(signal.SIGTERM, _shutdown)
-    asyncio.run(run_worker())
+    listener = _start_logging()
+    loop_factory = uvloop.new_event_loop if uvloop is not None else None
+    try:
+        with asyncio.Runner(loop_factory=loop_factory) as runner:
+            runner.run(run_worker())
+    finally:
+        listener.stop()
 
 
 if __name__ == "__main__":
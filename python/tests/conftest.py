@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def geo_payload() -> dict[str, Any]:
+    return {
+        "title": "City-scale VPS and 3D reconstruction",
+        "description": "Mapping pipeline for localization and AR",
+        "main_content": "This geospatial system uses VPS localization, pointcloud mesh fusion, and city mapping.",
+        "links": [{"href": "https://x.com/vps", "text": "VPS docs"}],
+        "article_date": "2026-01-10",
+    }
+
+
+@pytest.fixture(scope="module")
+def link_payload() -> dict[str, Any]:
+    return {
+        "links": [
+            {"href": "https://example.com/maps/vps", "text": "VPS mapping"},
+            {"href": "https://example.com/login", "text": "Sign in"},
+        ],
+        "title": "VPS",
+        "main_content": "",
+        "description": "",
+    }
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import asyncio
+import codecs
+
+import pytest
+
+from stashy import crawler
+from stashy.crawler import _META_SCAN_BYTES, _body_encoding, _charset, _lookup_encoding
+
+
+@pytest.mark.parametrize(
+    ("label", "expected"),
+    [
+        ("UTF8", "utf-8"),
+        ("Shift_JIS", "shift_jis"),
+        ("ISO-8859-1", "cp1252"),
+        ("latin-1", "cp1252"),
+        ("US-ASCII", "cp1252"),
+        ("bogus", None),
+        ("", None),
+    ],
+)
+def test_lookup_encoding(label: str, expected: str | None) -> None:
+    assert _lookup_encoding(label) == expected
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        ("text/html; charset=UTF-8", "utf-8"),
+        ('text/html;charset="utf-8"', "utf-8"),
+        ("text/html; CHARSET=Windows-1252", "cp1252"),
+        ("text/html; charset=ISO-8859-1", "cp1252"),
+        ("text/html; charset=bogus", None),
+        ("text/html; charset=", None),
+        ("text/html", None),
+    ],
+)
+def test_charset(header: str, expected: str | None) -> None:
+    assert _charset(header) == expected
+
+
+@pytest.mark.parametrize(
+    ("body", "header", "expected"),
+    [
+        # BOM beats the header.
+        (codecs.BOM_UTF8 + b"<html>", "text/html; charset=windows-1252", "utf-8-sig"),
+        (codecs.BOM_UTF16_LE + "<html>".encode("utf-16-le"), "text/html; charset=utf-8", "utf-16"),
+        (codecs.BOM_UTF16_BE + "<html>".encode("utf-16-be"), "text/html", "utf-16"),
+        # Header beats <meta>.
+        (b'<meta charset="shift_jis">', "text/html; charset=utf-8", "utf-8"),
+        (b"<html>", "text/html; charset=ISO-8859-1", "cp1252"),
+        # <meta> fills in when the header has no usable charset.
+        (b'<meta charset="Shift_JIS">', "text/html", "shift_jis"),
+        (b'<meta charset="Shift_JIS">', "text/html; charset=bogus", "shift_jis"),
+        (
+            b'<meta http-equiv="Content-Type" content="text/html; charset=windows-1252">',
+            "text/html",
+            "cp1252",
+        ),
+        (b"<meta charset=us-ascii>", "text/html", "cp1252"),
+        (b'<meta charset="utf-16">', "text/html", "utf-8"),
+        (b'<meta charset="UTF-16LE">', "text/html", "utf-8"),
+        # Nothing usable: the caller falls back to page.content().
+        (b"<html>", "text/html", None),
+        (b"<html>", "text/html; charset=bogus", None),
+        (b'<meta charset="bogus">', "text/html", None),
+        (b"<html>" + b" " * _META_SCAN_BYTES + b'<meta charset="utf-8">', "text/html", None),
+        (b"", "text/html", None),
+    ],
+)
+def test_body_encoding(body: bytes, header: str, expected: str | None) -> None:
+    assert _body_encoding(body, header) == expected
+
+
+class _FakePage:
+    def __init__(self, *, close_error: bool = False) -> None:
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.close_error = close_error
+
+    def set_default_timeout(self, timeout_ms: int) -> None:
+        pass
+
+    async def goto(self, url: str, **kwargs: object) -> None:
+        await self.gate.wait()
+        return None
+
+    async def content(self) -> str:
+        return "<html></html>"
+
+    async def close(self) -> None:
+        if self.close_error:
+            raise RuntimeError("Target page, context or browser has been closed")
+
+
+class _FakeContext:
+    def __init__(
+        self, *, fail_new_page: bool = False, hold_pages: bool = False, page_close_error: bool = False
+    ) -> None:
+        self.fail_new_page = fail_new_page
+        self.hold_pages = hold_pages
+        self.page_close_error = page_close_error
+        self.pages: list[_FakePage] = []
+        self.close_calls = 0
+
+    async def new_page(self) -> _FakePage:
+        if self.fail_new_page:
+            raise RuntimeError("Target page, context or browser has been closed")
+        page = _FakePage(close_error=self.page_close_error)
+        if self.hold_pages:
+            page.gate.clear()
+        self.pages.append(page)
+        return page
+
+    async def close(self) -> None:
+        self.close_calls += 1
+
+
+class _FakeBrowser:
+    def __init__(self, **context_kwargs: bool) -> None:
+        self.context_kwargs = context_kwargs
+        self.contexts: list[_FakeContext] = []
+
+    async def new_context(self, **kwargs: object) -> _FakeContext:
+        context = _FakeContext(**self.context_kwargs)
+        self.contexts.append(context)
+        return context
+
+
+def _install_browser(monkeypatch: pytest.MonkeyPatch, max_pages: int, **context_kwargs: bool) -> _FakeBrowser:
+    browser = _FakeBrowser(**context_kwargs)
+
+    async def get_browser() -> _FakeBrowser:
+        return browser
+
+    monkeypatch.setattr(crawler, "_get_browser", get_browser)
+    monkeypatch.setattr(crawler, "get_context_max_pages", lambda: max_pages)
+    monkeypatch.setattr(crawler, "_contexts", {})
+    monkeypatch.setattr(crawler, "_context_lock", asyncio.Lock())
+    return browser
+
+
+def test_context_retired_after_max_pages(monkeypatch: pytest.MonkeyPatch) -> None:
+    browser = _install_browser(monkeypatch, max_pages=3)
+
+    async def run() -> None:
+        for i in range(7):
+            assert await crawler.get_page_html(f"https://example.com/{i}") == ("<html></html>", None, None)
+
+    asyncio.run(run())
+    assert [len(c.pages) for c in browser.contexts] == [3, 3, 1]
+    assert [c.close_calls for c in browser.contexts] == [1, 1, 0]
+    assert list(crawler._contexts.values())[0].context is browser.contexts[-1]
+
+
+def test_retired_context_closes_once_after_last_page(monkeypatch: pytest.MonkeyPatch) -> None:
+    browser = _install_browser(monkeypatch, max_pages=2, hold_pages=True)
+
+    async def run() -> None:
+        fetches = [asyncio.create_task(crawler.get_page_html(f"https://example.com/{i}")) for i in range(2)]
+        while sum(len(c.pages) for c in browser.contexts) < 2:
+            await asyncio.sleep(0)
+        (context,) = browser.contexts
+        assert crawler._contexts == {}
+        assert context.close_calls == 0
+
+        context.pages[0].gate.set()
+        await fetches[0]
+        assert context.close_calls == 0
+
+        context.pages[1].gate.set()
+        await fetches[1]
+        assert context.close_calls == 1
+
+    asyncio.run(run())
+
+
+def test_page_close_error_still_releases_context(monkeypatch: pytest.MonkeyPatch) -> None:
+    browser = _install_browser(monkeypatch, max_pages=1, page_close_error=True)
+
+    result = asyncio.run(crawler.get_page_html("https://example.com/"))
+    assert result == ("<html></html>", None, None)
+    assert browser.contexts[0].close_calls == 1
+
+
+def test_failed_new_page_retires_context(monkeypatch: pytest.MonkeyPatch) -> None:
+    browser = _install_browser(monkeypatch, max_pages=50, fail_new_page=True)
+
+    async def run() -> list:
+        return [await crawler.get_page_html(f"https://example.com/{i}") for i in range(2)]
+
+    assert asyncio.run(run()) == [(None, 0, None), (None, 0, None)]
+    # Each failure retires its context, so the second fetch got a fresh one.
+    assert [c.close_calls for c in browser.contexts] == [1, 1]
+    assert crawler._contexts == {}
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from stashy.dom_analyzer import parse_page
+
+
+def _expected(html: str, limit: int) -> str:
+    return " ".join(parse_page(html).raw_text.split())[:limit]
+
+
+@pytest.mark.parametrize(
+    ("html", "limit"),
+    [
+        ("", 10),
+        ("<p>short text</p>", 10000),
+        ("<p>" + "word " * 5000 + "</p>", 10000),
+        ("<p>" + "x" * 30 + "</p>", 10),  # one word longer than the whole window
+        ("<p>a" + " " * 500 + "b</p>", 3),  # whitespace run wider than the window
+        ("<p>" + "ab " * 100 + "</p>", 0),
+        ("<p>one</p>\n\n<div>\ttwo three</div>", 9),
+    ],
+)
+def test_visible_text_matches_full_normalization(html: str, limit: int) -> None:
+    assert parse_page(html).visible_text(limit) == _expected(html, limit)
+
+
+def test_visible_text_matches_full_normalization_fuzzed() -> None:
+    rng = random.Random(19)
+    tokens = ["a", "bb", "geospatial", " ", "  ", "\n", "\t", " ", "<b>x</b>", "<br>"]
+    for _ in range(300):
+        html = "<p>" + "".join(rng.choice(tokens) for _ in range(rng.randint(0, 400))) + "</p>"
+        limit = rng.randint(0, 300)
+        assert parse_page(html).visible_text(limit) == _expected(html, limit)
+
+
+def test_visible_text_skips_script_and_style() -> None:
+    html = "<style>p { color: red }</style><script>var vps = 1;</script><p>visible</p>"
+    assert parse_page(html).visible_text(100) == "visible"
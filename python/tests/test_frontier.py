@@ -1,46 +1,63 @@
 from __future__ import annotations
 
-import unittest
+import pytest
 
 from stashy.frontier import canonicalize_url, compute_geo_signals, frontier_candidates
 
 
-class FrontierTests(unittest.TestCase):
-    def test_canonicalize_url(self) -> None:
-        self.assertEqual(
-            canonicalize_url("https://Example.com/maps/path#frag"),
-            "https://example.com/maps/path",
-        )
-
-    def test_geo_signals_detect_geospatial_text(self) -> None:
-        payload = {
-            "title": "City-scale VPS and 3D reconstruction",
-            "description": "Mapping pipeline for localization and AR",
-            "main_content": "This geospatial system uses VPS localization, pointcloud mesh fusion, and city mapping.",
-            "links": [{"href": "https://x.com/vps", "text": "VPS docs"}],
-            "article_date": "2026-01-10",
-        }
-        signals = compute_geo_signals("https://example.com/research/vps", payload)
-        self.assertGreater(signals.aggregate_score, 0.35)
-
-    def test_frontier_candidates_respect_depth(self) -> None:
-        payload = {
-            "links": [{"href": "https://example.com/maps/vps", "text": "VPS mapping"}],
-            "title": "VPS",
-            "main_content": "",
-            "description": "",
-        }
-        cands = frontier_candidates(
-            parent_url="https://example.com/",
-            payload=payload,
-            html="",
-            current_depth=2,
-            max_depth=2,
-            max_links=10,
-            page_geo_score=0.7,
-        )
-        self.assertEqual([], cands)
-
-
-if __name__ == "__main__":
-    unittest.main()
+@pytest.mark.parametrize(
+    ("url", "expected"),
+    [
+        ("https://Example.com/maps/path#frag", "https://example.com/maps/path"),
+        ("HTTPS://EXAMPLE.com/a/?x=1#f", "https://example.com/a/?x=1"),
+        ("ftp://example.com/x", ""),
+        ("https:///no-host", ""),
+    ],
+)
+def test_canonicalize_url(url: str, expected: str) -> None:
+    assert canonicalize_url(url) == expected
+
+
+@pytest.mark.parametrize(
+    ("url", "expect_min"),
+    [
+        ("https://example.com/research/vps", 0.35),
+        ("https://example.com/", 0.35),
+    ],
+)
+def test_geo_signals_detect_geospatial_text(geo_payload: dict, url: str, expect_min: float) -> None:
+    signals = compute_geo_signals(url, geo_payload)
+    assert signals.aggregate_score > expect_min
+
+
+@pytest.mark.parametrize("current_depth", [2, 3])
+def test_frontier_candidates_respect_depth(link_payload: dict, current_depth: int) -> None:
+    cands = frontier_candidates(
+        parent_url="https://example.com/",
+        payload=link_payload,
+        html="",
+        current_depth=current_depth,
+        max_depth=2,
+        max_links=10,
+        page_geo_score=0.7,
+    )
+    assert cands == []
+
+
+def test_frontier_candidates_apply_min_geo_score(link_payload: dict) -> None:
+    kwargs = dict(
+        parent_url="https://example.com/",
+        payload=link_payload,
+        html="",
+        current_depth=0,
+        max_depth=2,
+        max_links=10,
+        page_geo_score=0.5,
+    )
+    everything = frontier_candidates(**kwargs)
+    threshold = min(c.geo_score for c in everything) + 1e-6
+    kept = frontier_candidates(**kwargs, min_geo_score=threshold)
+    assert kept == [c for c in everything if c.geo_score >= threshold]
+    assert len(kept) < len(everything)
+    # No link can score above 0.72 + 0.28 * page_geo_score.
+    assert frontier_candidates(**kwargs, min_geo_score=0.9) == []
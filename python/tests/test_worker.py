@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from stashy import worker
+from stashy.worker import BURST_QUEUE_DEPTH, AdaptiveBatcher
+
+DEEP = BURST_QUEUE_DEPTH + 1
+FAST_MS = 100.0
+SLOW_MS = 5000.0
+
+
+@pytest.fixture
+def batcher() -> AdaptiveBatcher:
+    return AdaptiveBatcher(base_size=10, min_size=2, max_size=40, target_p95_ms=1000.0)
+
+
+def test_starts_at_base_size(batcher: AdaptiveBatcher) -> None:
+    assert batcher.optimal_size() == 10
+
+
+def test_grows_on_full_claims_from_a_deep_queue_up_to_max(batcher: AdaptiveBatcher) -> None:
+    sizes = []
+    for _ in range(4):
+        batcher.record(batcher.optimal_size(), FAST_MS, DEEP)
+        sizes.append(batcher.optimal_size())
+    assert sizes == [20, 40, 40, 40]
+
+
+def test_remembers_queue_depth_between_samples(batcher: AdaptiveBatcher) -> None:
+    batcher.record(10, FAST_MS, DEEP)
+    batcher.record(20, FAST_MS)
+    assert batcher.optimal_size() == 40
+
+
+@pytest.mark.parametrize(
+    ("claimed", "queue_depth"),
+    [
+        (5, DEEP),  # queue ran dry before the claim filled
+        (10, BURST_QUEUE_DEPTH),  # full claim but a shallow queue
+    ],
+)
+def test_holds_base_size_without_a_burst(batcher: AdaptiveBatcher, claimed: int, queue_depth: int) -> None:
+    batcher.record(claimed, FAST_MS, queue_depth)
+    assert batcher.optimal_size() == 10
+
+
+def test_shrinks_on_slow_batches_down_to_min(batcher: AdaptiveBatcher) -> None:
+    sizes = []
+    for _ in range(4):
+        # Slow p95 wins even when the queue is deep and the claim was full.
+        batcher.record(batcher.optimal_size(), SLOW_MS, DEEP)
+        sizes.append(batcher.optimal_size())
+    assert sizes == [5, 2, 2, 2]
+
+
+@pytest.mark.parametrize(
+    ("start", "expected"),
+    [
+        (40, [20, 10, 10]),
+        (2, [4, 8, 10]),
+    ],
+)
+def test_drifts_back_to_base_size(batcher: AdaptiveBatcher, start: int, expected: list[int]) -> None:
+    batcher.size = start
+    sizes = []
+    for _ in expected:
+        batcher.record(1, FAST_MS, 0)
+        sizes.append(batcher.optimal_size())
+    assert sizes == expected
+
+
+class _NeedsResponse(Exception):
+    """Like openai's APIStatusError: unpickling calls __init__ without `response`."""
+
+    def __init__(self, message: str, *, response: object) -> None:
+        super().__init__(message)
+        self.response = response
+
+
+def _rate_limited() -> None:
+    raise _NeedsResponse("429 Too Many Requests", response=object())
+
+
+def _slow_ok(value: int) -> int:
+    time.sleep(0.3)
+    return value
+
+
+def test_pool_survives_exceptions_that_cannot_be_unpickled(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(worker, "_analysis_workers", 2)
+    executor = worker._new_analysis_executor()
+
+    async def run() -> list:
+        loop = asyncio.get_running_loop()
+        calls = [loop.run_in_executor(executor, worker._pool_safe, _slow_ok, i) for i in range(3)]
+        calls.insert(1, loop.run_in_executor(executor, worker._pool_safe, _rate_limited))
+        first = await asyncio.gather(*calls, return_exceptions=True)
+        later = await loop.run_in_executor(executor, worker._pool_safe, _slow_ok, 7)
+        return [*first, later]
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    assert [results[0], *results[2:]] == [0, 1, 2, 7]
+    assert isinstance(results[1], RuntimeError)
+    assert str(results[1]) == "_NeedsResponse: 429 Too Many Requests"
+
+
+class _StubbedStages:
+    """
+    Stubs the I/O under the three stages. url_id % 6 picks the outcome: 0 succeeds,
+    1 fetches no HTML, 2 fetch raises, 3 analysis raises, 4 finalize raises, and 5
+    fails analysis with mark_url_failed also raising, which escapes the stage itself.
+    """
+
+    def __init__(self, monkeypatch: pytest.MonkeyPatch, stop: asyncio.Event, stop_after: int | None) -> None:
+        self.stop = stop
+        self.stop_after = stop_after
+        self.fetched: list[int] = []
+        self.finalized: list[int] = []
+        self.marked: list[int] = []
+        monkeypatch.setattr(worker, "get_page_html", self.get_page_html)
+        monkeypatch.setattr(worker, "_analyze", self.analyze)
+        monkeypatch.setattr(worker, "finalize_page", self.finalize_page)
+        monkeypatch.setattr(worker, "mark_url_failed", self.mark_url_failed)
+        monkeypatch.setattr(worker, "upsert_discovered_urls", self.upsert_discovered_urls)
+        monkeypatch.setattr(worker, "_frontier_rows", lambda **kwargs: [("https://example.com/next",)])
+
+    @staticmethod
+    def _id(url: str) -> int:
+        return int(url.rsplit("/", 1)[1])
+
+    async def get_page_html(self, url: str) -> tuple[str | None, int, str | None]:
+        url_id = self._id(url)
+        self.fetched.append(url_id)
+        if self.stop_after is not None and len(self.fetched) >= self.stop_after:
+            self.stop.set()
+        await asyncio.sleep((url_id % 3) * 0.001)
+        if url_id % 6 == 1:
+            return (None, 0, None)
+        if url_id % 6 == 2:
+            raise RuntimeError("connection reset")
+        return ("<html></html>", 200, "text/html")
+
+    async def analyze(self, html: str, url: str) -> tuple[dict, float]:
+        await asyncio.sleep(0.001)
+        if self._id(url) % 6 in (3, 5):
+            raise ValueError("bad reply")
+        return ({}, 0.9)
+
+    async def finalize_page(self, url_id: int, *args: object, **kwargs: object) -> int:
+        await asyncio.sleep((url_id % 2) * 0.001)
+        if url_id % 6 == 4:
+            raise RuntimeError("deadlock detected")
+        self.finalized.append(url_id)
+        return url_id
+
+    async def mark_url_failed(self, url_id: int, error: str) -> None:
+        self.marked.append(url_id)
+        if url_id % 6 == 5:
+            raise ConnectionError("pool closed")
+
+    async def upsert_discovered_urls(self, parent_url_id: int, frontier: list) -> int:
+        return len(frontier)
+
+
+def _run_batch(
+    monkeypatch: pytest.MonkeyPatch, n: int, widths: tuple[int, int, int], stop_after: int | None = None
+) -> tuple[_StubbedStages, worker.WorkerCounters]:
+    stop = asyncio.Event()
+    stages = _StubbedStages(monkeypatch, stop, stop_after)
+    counters = worker.WorkerCounters()
+    rows = [{"id": i, "url": f"https://example.com/{i}", "depth": 0} for i in range(n)]
+    limits = worker.FrontierLimits(max_depth=2, max_links=10, min_geo_score=0.0)
+    fetchers, analyzers, writers = widths
+    batch = worker._process_batch(
+        rows,
+        counters,
+        worker.WorkerRuntime(),
+        limits,
+        stop,
+        fetchers=fetchers,
+        analyzers=analyzers,
+        writers=writers,
+    )
+    asyncio.run(asyncio.wait_for(batch, timeout=10))
+    return stages, counters
+
+
+@pytest.mark.parametrize("widths", [(1, 1, 1), (4, 2, 2), (8, 1, 3), (2, 5, 1)])
+def test_process_batch_settles_every_job_once(
+    monkeypatch: pytest.MonkeyPatch, widths: tuple[int, int, int]
+) -> None:
+    stages, counters = _run_batch(monkeypatch, 36, widths)
+
+    assert sorted(stages.finalized + stages.marked) == list(range(36))
+    assert sorted(stages.finalized) == [i for i in range(36) if i % 6 == 0]
+    assert counters.processed == len(stages.finalized)
+    assert counters.failed == len(stages.marked)
+    assert counters.frontier_enqueued == counters.frontier_new == counters.processed
+
+
+def test_process_batch_drains_fetched_pages_after_stop(monkeypatch: pytest.MonkeyPatch) -> None:
+    stages, counters = _run_batch(monkeypatch, 36, (2, 1, 1), stop_after=8)
+
+    assert 8 <= len(stages.fetched) < 36
+    assert sorted(stages.finalized + stages.marked) == sorted(stages.fetched)
+    assert counters.processed + counters.failed == len(stages.fetched)